@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Load test for the Streamlit app.
+
+Runs N concurrent sessions of login -> upload -> analyse -> create PDF through
+Streamlit's AppTest, every session in its own process. OpenAI and the gauge
+api are replaced by local stand-in servers with a configurable latency.
+
+    python run_load_test.py --ara ara.pdf --rhine rhine.pdf --sessions 20 --concurrency 5 --llm-latency 2
+
+Needs a Streamlit version where AppTest supports file_uploader.set_value.
+"""
+
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+current_dir = Path(__file__).parent
+sys.path.insert(0, str(current_dir))
+
+from src.OpenAiStandIn import LocalOpenAIServer
+from src.MorningUpdate.GaugeStandIn import LocalGaugeServer
+
+
+STEPS = ["login", "upload", "analyse", "create_pdf"]
+
+
+def _click(at, label: str, timeout: float):
+    button = next(b for b in at.button if b.label == label)
+    button.click().run(timeout=timeout)
+
+
+def _check(at, step: str):
+    if at.exception:
+        raise RuntimeError(f"{step}: {at.exception[0].message}")
+    for error in at.error:
+        raise RuntimeError(f"{step}: {error.value}")
+
+
+def run_session(session_id: int, ara_pdf: bytes, rhine_pdf: bytes, timeout: float) -> dict:
+    """One user going through the app, returns the duration of every step."""
+    from streamlit.testing.v1 import AppTest
+
+    timings = {}
+    error = None
+    started = time.perf_counter()
+    try:
+        at = AppTest.from_file(str(current_dir / "streamlit_app.py"), default_timeout=timeout)
+        at.run()
+
+        step_start = time.perf_counter()
+        at.text_input[0].input("admin")
+        at.text_input[1].input("password")
+        _click(at, "Login", timeout)
+        _check(at, "login")
+        timings["login"] = time.perf_counter() - step_start
+
+        step_start = time.perf_counter()
+        at.file_uploader[0].set_value([
+            ("ara.pdf", ara_pdf, "application/pdf"),
+            ("rhine.pdf", rhine_pdf, "application/pdf"),
+        ]).run(timeout=timeout)
+        _check(at, "upload")
+        timings["upload"] = time.perf_counter() - step_start
+
+        step_start = time.perf_counter()
+        _click(at, "Analyse Files", timeout)
+        _check(at, "analyse")
+        timings["analyse"] = time.perf_counter() - step_start
+
+        step_start = time.perf_counter()
+        _click(at, "Create barging PDF Report", timeout)
+        _check(at, "create_pdf")
+        timings["create_pdf"] = time.perf_counter() - step_start
+    except Exception as e:
+        error = str(e)
+
+    return {
+        "session": session_id,
+        "pid": os.getpid(),
+        "total": time.perf_counter() - started,
+        "steps": timings,
+        "error": error,
+        # peak resident memory of the session process, ru_maxrss is in KiB on Linux
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def _percentiles(values) -> dict:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(p50, 3), "p95": round(p95, 3), "p99": round(p99, 3)}
+
+
+def run_load_test(ara_pdf: bytes, rhine_pdf: bytes, sessions: int, concurrency: int,
+                  llm_latency: float, gauge_latency: float, timeout: float) -> dict:
+    gauges = {gauge_id: (250.0, [245.0, 240.0, 235.0, 230.0])
+              for gauge_id in ("DUISBURG-RUHRORT", "KÖLN", "KAUB", "MAXAU")}
+    with LocalOpenAIServer(latency=llm_latency) as openai_server, \
+            LocalGaugeServer(gauges, latency=gauge_latency) as gauge_server, \
+            tempfile.TemporaryDirectory() as output_dir:
+        # the session processes inherit these
+        os.environ["OPENAI_BASE_URL"] = openai_server.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "load-test")
+        os.environ["GAUGE_API_URL"] = gauge_server.base_url
+        os.environ["REPORT_OUTPUT_DIR"] = output_dir
+        os.environ["WATER_LEVEL_DATA_DIR"] = output_dir
+
+        started = time.perf_counter()
+        # a fresh process per session: AppTest replaces __main__ of the process it runs in,
+        # and it keeps the RSS numbers per session
+        with ProcessPoolExecutor(max_workers=concurrency, max_tasks_per_child=1) as executor:
+            futures = [executor.submit(run_session, i, ara_pdf, rhine_pdf, timeout) for i in range(sessions)]
+            results = [f.result() for f in futures]
+        wall_time = time.perf_counter() - started
+        llm_requests = openai_server.chat_requests
+
+    ok = [r for r in results if r["error"] is None]
+    return {
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "llm_latency_s": llm_latency,
+        "failed": len(results) - len(ok),
+        "errors": sorted({r["error"] for r in results if r["error"]}),
+        "wall_time_s": round(wall_time, 2),
+        "throughput_sessions_per_min": round(len(ok) / wall_time * 60, 2),
+        "llm_requests": llm_requests,
+        "session_latency_s": _percentiles([r["total"] for r in ok]),
+        "step_latency_s": {step: _percentiles([r["steps"][step] for r in ok]) for step in STEPS},
+        "rss_mb": {
+            "max": round(max(r["rss_mb"] for r in results), 1),
+            "mean": round(float(np.mean([r["rss_mb"] for r in results])), 1),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Streamlit app with concurrent sessions")
+    parser.add_argument("--ara", required=True, help="ARA barge freight pdf")
+    parser.add_argument("--rhine", required=True, help="Rhine barge freight pdf")
+    parser.add_argument("--sessions", type=int, default=10, help="total number of sessions")
+    parser.add_argument("--concurrency", type=int, default=5, help="sessions running at the same time")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="seconds per fake OpenAI call")
+    parser.add_argument("--gauge-latency", type=float, default=0.2, help="seconds per fake gauge request")
+    parser.add_argument("--timeout", type=float, default=120, help="timeout of a single app run")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    with open(args.ara, "rb") as f:
+        ara_pdf = f.read()
+    with open(args.rhine, "rb") as f:
+        rhine_pdf = f.read()
+
+    print(f"🚀 {args.sessions} sessions, {args.concurrency} concurrent, LLM latency {args.llm_latency}s")
+    report = run_load_test(ara_pdf, rhine_pdf, args.sessions, args.concurrency,
+                           args.llm_latency, args.gauge_latency, args.timeout)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print("=" * 50)
+    print(f"✅ Sessions ok: {report['sessions'] - report['failed']}/{report['sessions']}")
+    for error in report["errors"]:
+        print(f"❌ {error}")
+    print(f"⏱️ Wall time: {report['wall_time_s']}s")
+    print(f"📈 Throughput: {report['throughput_sessions_per_min']} sessions/min")
+    print(f"🤖 LLM requests: {report['llm_requests']}")
+    latency = report["session_latency_s"]
+    print(f"🕒 Session latency: p50 {latency['p50']}s  p95 {latency['p95']}s  p99 {latency['p99']}s")
+    for step, latency in report["step_latency_s"].items():
+        print(f"   {step:<11} p50 {latency['p50']}s  p95 {latency['p95']}s  p99 {latency['p99']}s")
+    print(f"💾 RSS per session process: max {report['rss_mb']['max']} MB, mean {report['rss_mb']['mean']} MB")
+
+
+if __name__ == "__main__":
+    main()
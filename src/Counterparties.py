@@ -0,0 +1,199 @@
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+import pandas as pd
+
+from .models import Trade, Offers_Bids
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+ALIASES_PATH = os.path.join(DATA_DIR, "counterparty_aliases.json")
+
+# legal forms that don't tell counterparties apart
+LEGAL_SUFFIXES = {"bv", "nv", "sa", "ag", "gmbh", "ltd", "limited", "plc", "inc", "llc", "corp", "co", "se", "spa"}
+
+
+def normalize_name(name: str) -> str:
+    """Key used to match spelling variants: no accents, case, punctuation or legal form."""
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    name = name.lower().replace("&", " and ")
+    # "B.V." -> "bv" before the punctuation is replaced by spaces
+    name = re.sub(r"\b(\w)\.(?=\w\b)", r"\1", name)
+    tokens = re.sub(r"[^a-z0-9]+", " ", name).split()
+    tokens = [t for t in tokens if t not in LEGAL_SUFFIXES] or tokens
+    return " ".join(tokens)
+
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CounterpartyIndex:
+    """Maps raw buyer/seller/participant names to canonical counterparty ids.
+
+    Lookups go raw name cache -> normalized key -> trigram similarity against
+    the registered aliases. Fuzzy matches and unknown names are only cached,
+    never stored as aliases, so a match can't drift from one spelling to the
+    next. Aliases are only added explicitly (add, add_alias, register).
+    """
+
+    def __init__(self, min_similarity: float = 0.7):
+        self.min_similarity = min_similarity
+        self._names: Dict[str, str] = {}      # canonical id -> display name
+        self._keys: Dict[str, str] = {}       # normalized alias -> canonical id
+        self._trigrams: Dict[str, Set[str]] = defaultdict(set)  # trigram -> normalized aliases
+        self._cache: Dict[str, Optional[str]] = {}  # raw name -> canonical id, None if unknown
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str = ALIASES_PATH, **kwargs) -> "CounterpartyIndex":
+        index = cls(**kwargs)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for canonical_id, entry in data.get("counterparties", {}).items():
+                index.add(canonical_id, entry["name"], entry.get("aliases", []))
+        return index
+
+    def save(self, path: str = ALIASES_PATH):
+        aliases = defaultdict(list)
+        for key, canonical_id in self._keys.items():
+            aliases[canonical_id].append(key)
+        data = {"counterparties": {
+            canonical_id: {"name": name, "aliases": sorted(aliases[canonical_id])}
+            for canonical_id, name in sorted(self._names.items())
+        }}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+
+    def _add_key(self, key: str, canonical_id: str):
+        self._keys[key] = canonical_id
+        for trigram in _trigrams(key):
+            self._trigrams[trigram].add(key)
+        # new aliases can change fuzzy matches and unknown names
+        self._cache.clear()
+
+    def add(self, canonical_id: str, name: str, aliases: Iterable[str] = ()):
+        """Add or extend a counterparty, its name is an alias as well."""
+        with self._lock:
+            self._names.setdefault(canonical_id, name)
+            for alias in [name, *aliases]:
+                key = normalize_name(alias)
+                if key:
+                    self._add_key(key, canonical_id)
+
+    def add_alias(self, alias: str, canonical_id: str):
+        if canonical_id not in self._names:
+            raise KeyError(f"Unknown counterparty: {canonical_id}")
+        self.add(canonical_id, self._names[canonical_id], [alias])
+
+    def _fuzzy(self, key: str) -> Optional[str]:
+        grams = _trigrams(key)
+        shared = Counter()
+        for trigram in grams:
+            shared.update(self._trigrams.get(trigram, ()))
+        best_key, best_score = None, 0.0
+        for candidate, count in shared.items():
+            # Dice coefficient of the trigram sets
+            score = 2 * count / (len(grams) + len(_trigrams(candidate)))
+            if score > best_score:
+                best_key, best_score = candidate, score
+        if best_key is not None and best_score >= self.min_similarity:
+            return self._keys[best_key]
+        return None
+
+    def resolve(self, name: Optional[str], register: bool = False) -> Optional[str]:
+        """Canonical id of a raw name, None if unknown.
+
+        With `register` an unknown name becomes a new counterparty.
+        """
+        if not name:
+            return None
+        with self._lock:
+            if name in self._cache:
+                cached = self._cache[name]
+                if cached is not None or not register:
+                    return cached
+
+            key = normalize_name(name)
+            if not key:
+                return None
+            canonical_id = self._keys.get(key) or self._fuzzy(key)
+            if canonical_id is None and register:
+                canonical_id = key.replace(" ", "-")
+                self._names.setdefault(canonical_id, name.strip())
+                self._add_key(key, canonical_id)
+            self._cache[name] = canonical_id
+        return canonical_id
+
+    def name(self, canonical_id: str) -> str:
+        return self._names.get(canonical_id, canonical_id)
+
+    def resolve_many(self, names: Iterable[Optional[str]], register: bool = False) -> List[Optional[str]]:
+        return [self.resolve(name, register) for name in names]
+
+    def map_series(self, names: pd.Series, register: bool = False) -> pd.Series:
+        """Resolve a column of names, every distinct spelling is looked up once."""
+        unique = pd.unique(names.dropna())
+        mapping = dict(zip(unique, self.resolve_many(unique, register)))
+        return names.map(mapping)
+
+
+_default_index: Optional[CounterpartyIndex] = None
+_default_index_lock = threading.Lock()
+
+
+def get_default_index() -> CounterpartyIndex:
+    """The index of the shipped alias file, loaded on first use and shared between callers."""
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = CounterpartyIndex.load()
+        return _default_index
+
+
+def counterparty_volumes(trades: Iterable[Trade], index: CounterpartyIndex, register: bool = False) -> pd.DataFrame:
+    """Bought, sold and total volume in kt per canonical counterparty."""
+    df = pd.DataFrame(
+        [(t.buyer, t.seller, t.volume_kt) for t in trades],
+        columns=["buyer", "seller", "volume_kt"],
+    )
+    columns = ["counterparty", "name", "bought_kt", "sold_kt", "total_kt"]
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+
+    sides = pd.concat([
+        pd.DataFrame({"counterparty": index.map_series(df["buyer"], register), "side": "bought_kt",
+                      "volume_kt": df["volume_kt"]}),
+        pd.DataFrame({"counterparty": index.map_series(df["seller"], register), "side": "sold_kt",
+                      "volume_kt": df["volume_kt"]}),
+    ]).dropna(subset=["counterparty"])
+
+    totals = sides.pivot_table(index="counterparty", columns="side", values="volume_kt",
+                               aggfunc="sum", fill_value=0)
+    totals = totals.reindex(columns=["bought_kt", "sold_kt"], fill_value=0).reset_index()
+    totals.columns.name = None
+    totals["total_kt"] = totals["bought_kt"] + totals["sold_kt"]
+    totals["name"] = totals["counterparty"].map(index.name)
+    return totals[columns].sort_values("total_kt", ascending=False, kind="stable", ignore_index=True)
+
+
+def counterparty_activity(offers_bids: Iterable[Offers_Bids], index: CounterpartyIndex,
+                          register: bool = False) -> pd.DataFrame:
+    """Number of offers and bids per canonical counterparty."""
+    df = pd.DataFrame([(ob.participant, ob.type) for ob in offers_bids], columns=["participant", "type"])
+    if df.empty:
+        return pd.DataFrame(columns=["counterparty", "name", "offer", "bid"])
+    df["counterparty"] = index.map_series(df["participant"], register)
+    counts = pd.crosstab(df["counterparty"], df["type"]).reindex(columns=["offer", "bid"], fill_value=0)
+    counts = counts.reset_index()
+    counts.columns.name = None
+    counts["name"] = counts["counterparty"].map(index.name)
+    return counts[["counterparty", "name", "offer", "bid"]]
@@ -0,0 +1,247 @@
+import csv
+import dataclasses
+import glob
+import io
+import json
+import os
+import tempfile
+from datetime import datetime
+from itertools import chain, islice
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union, get_args, get_origin, get_type_hints
+
+import numpy as np
+import pandas as pd
+
+from src.models import OverView, Offers_Bids, RawTradeText, Trade, Windows
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+# where the inbox daemon writes its JSON results
+RESULTS_DIR = os.path.join(DATA_DIR, "inbox_results")
+
+# format -> (file extension, mime type)
+EXPORT_FORMATS = {
+    "csv": ("csv", "text/csv"),
+    "xlsx": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+DEFAULT_CHUNK_SIZE = 5000
+# rows read ahead to find the type of columns that start out empty
+PARQUET_LOOKAHEAD_ROWS = 50000
+
+# record type of every table in a MOC result
+TABLE_RECORDS = {
+    "trades": Trade,
+    "offers_bids": Offers_Bids,
+    "overviews": OverView,
+    "windows": Windows,
+    "raw_trades": RawTradeText,
+}
+
+
+def _typed_rows(records) -> Tuple[List[str], Dict[str, Any], Iterator[tuple]]:
+    """Columns, their declared type where the records have one, and a lazy row iterator.
+
+    DataFrames declare their dtypes, dataclasses their field annotations,
+    plain dicts nothing.
+    """
+    if isinstance(records, pd.DataFrame):
+        # NaN becomes an empty cell / null instead of the text "nan"
+        rows = (tuple(None if isinstance(v, float) and v != v else v for v in row)
+                for row in records.itertuples(index=False, name=None))
+        return [str(c) for c in records.columns], dict(zip(map(str, records.columns), records.dtypes)), rows
+
+    records = iter(records)
+    first = next(records, None)
+    if first is None:
+        return [], {}, iter(())
+    if dataclasses.is_dataclass(first):
+        columns = [f.name for f in dataclasses.fields(first)]
+        types = get_type_hints(type(first))
+        to_row = lambda r: tuple(getattr(r, c) for c in columns)
+    elif isinstance(first, dict):
+        columns = list(first.keys())
+        types = {}
+        to_row = lambda r: tuple(r.get(c) for c in columns)
+    else:
+        raise TypeError(f"Cannot export records of type {type(first).__name__}")
+    return columns, types, (to_row(r) for r in chain([first], records))
+
+
+def iter_rows(records) -> Tuple[List[str], Iterator[tuple]]:
+    """Column names and a lazy row iterator for a DataFrame or an iterable of dataclasses/dicts."""
+    columns, _, rows = _typed_rows(records)
+    return columns, rows
+
+
+def table_types(table: str) -> Dict[str, Any]:
+    """Declared column types of a MOC table, for records that arrive as plain dicts."""
+    record_type = TABLE_RECORDS.get(table)
+    return dict(get_type_hints(record_type), report_date=str) if record_type else {}
+
+
+def _chunks(rows: Iterator[tuple], chunk_size: int) -> Iterator[List[tuple]]:
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def stream_csv(records, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """CSV as a stream of byte chunks, one chunk per `chunk_size` rows."""
+    columns, rows = iter_rows(records)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for chunk in _chunks(rows, chunk_size):
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def write_xlsx(records, target, sheet_name: str = "data"):
+    """Write an Excel sheet row by row with openpyxl's write-only (constant memory) workbook."""
+    from openpyxl import Workbook
+
+    columns, rows = iter_rows(records)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    sheet.append(columns)
+    for row in rows:
+        sheet.append(list(row))
+    workbook.save(target)
+
+
+def _arrow_type(declared):
+    """Arrow type of a declared python type or numpy dtype, None when it has to be inferred."""
+    import pyarrow as pa
+
+    if isinstance(declared, np.dtype):
+        return pa.from_numpy_dtype(declared) if declared.kind in "biufM" else None
+    if get_origin(declared) is Union:
+        args = [arg for arg in get_args(declared) if arg is not type(None)]
+        declared = args[0] if len(args) == 1 else None
+    return {float: pa.float64(), int: pa.int64(), str: pa.string(), bool: pa.bool_()}.get(declared)
+
+
+def _infer_arrow_type(values: list):
+    import pyarrow as pa
+
+    try:
+        inferred = pa.array(values).type
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.string()
+    # JSON and LLM output write 2.0 as 2, an integer column may still get floats later on
+    return pa.float64() if pa.types.is_integer(inferred) else inferred
+
+
+def write_parquet(records, target, chunk_size: int = DEFAULT_CHUNK_SIZE, types: Optional[Dict[str, Any]] = None):
+    """Write a parquet file one row group per chunk.
+
+    The schema comes from the declared types (DataFrame dtypes, dataclass
+    annotations or `types`). Other columns are inferred from the data; chunks
+    are read ahead, up to PARQUET_LOOKAHEAD_ROWS, until every column has a
+    value. Columns that stay empty are written as strings.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns, declared, rows = _typed_rows(records)
+    declared.update(types or {})
+    fields = {c: _arrow_type(declared.get(c)) for c in columns}
+
+    chunks = _chunks(rows, chunk_size)
+    buffered: List[List[tuple]] = []
+    while not all(fields.values()) and sum(map(len, buffered)) < PARQUET_LOOKAHEAD_ROWS:
+        chunk = next(chunks, None)
+        if chunk is None:
+            break
+        buffered.append(chunk)
+        for i, column in enumerate(columns):
+            if fields[column] is None:
+                values = [row[i] for row in chunk if row[i] is not None]
+                if values:
+                    fields[column] = _infer_arrow_type(values)
+
+    schema = pa.schema([(c, fields[c] or pa.string()) for c in columns])
+    with pq.ParquetWriter(target, schema) as writer:
+        for chunk in chain(buffered, chunks):
+            writer.write_table(pa.Table.from_pylist([dict(zip(columns, row)) for row in chunk], schema=schema))
+
+
+def export_to(records, fmt: str, target: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE,
+              types: Optional[Dict[str, Any]] = None):
+    """Write records in `fmt`, `types` declares column types for parquet."""
+    if fmt == "csv":
+        for chunk in stream_csv(records, chunk_size):
+            target.write(chunk)
+    elif fmt == "xlsx":
+        write_xlsx(records, target)
+    elif fmt == "parquet":
+        write_parquet(records, target, chunk_size, types)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+
+def stream_export(records, fmt: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  read_size: int = 1024 * 1024, types: Optional[Dict[str, Any]] = None) -> Iterator[bytes]:
+    """Export as a stream of bytes.
+
+    CSV is produced while the records are read. xlsx and parquet need a
+    seekable file, they are written to a temp file (spooled to disk when
+    large) and streamed from there.
+    """
+    if fmt == "csv":
+        yield from stream_csv(records, chunk_size)
+        return
+    with tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024) as f:
+        export_to(records, fmt, f, chunk_size, types)
+        f.seek(0)
+        for block in iter(lambda: f.read(read_size), b""):
+            yield block
+
+
+def export_bytes(records, fmt: str) -> bytes:
+    """Whole export in memory, for small tables like the ones in the Streamlit app."""
+    buffer = io.BytesIO()
+    export_to(records, fmt, buffer)
+    return buffer.getvalue()
+
+
+def _parse_date(text: Optional[str]) -> Optional[datetime]:
+    for fmt in ("%d-%m-%Y", "%Y-%m-%d", "%d/%m/%Y", "%d.%m.%Y"):
+        try:
+            return datetime.strptime(str(text).strip(), fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def iter_result_records(table: str, results_dir: str = RESULTS_DIR,
+                        date_from: Optional[str] = None, date_to: Optional[str] = None) -> Iterator[dict]:
+    """Records of one table ("trades", "offers_bids", "overviews", "windows") from stored MOC results.
+
+    Reads the JSON results of the inbox daemon one file at a time, so any date
+    range can be exported without loading all results.
+    """
+    start = _parse_date(date_from) if date_from else None
+    end = _parse_date(date_to) if date_to else None
+    for path in sorted(glob.glob(os.path.join(results_dir, "*.json"))):
+        if os.path.basename(path) == "processed.json":
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            result = json.load(f)
+        if table not in result:
+            continue
+        if start or end:
+            report_date = _parse_date(result.get("date"))
+            if report_date is None or (start and report_date < start) or (end and report_date > end):
+                continue
+        for record in result[table]:
+            # windows have no date of their own
+            yield {"report_date": result.get("date"), **record} if "date" not in record else record
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Watches an inbox folder and processes incoming reports as soon as they are complete.
+
+New PDFs go through GasOilExtractor, new .txt MOC reports through ParsedReport
+(plus the LLM trade extraction). Results are written as JSON next to a ledger
+of processed files, so a restart doesn't redo any work.
+
+    python -m src.InboxDaemon /srv/reports/inbox --workers 2
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import hashlib
+import json
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.Export import RESULTS_DIR
+from src.ReportService import analyse_pdf, extractor_to_dict, parse_moc_report
+
+# inotify flags from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_MODIFY = 0x00000002
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    """Directory watcher on top of the Linux inotify api (through ctypes)."""
+
+    def __init__(self, directory: str):
+        libc_name = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or not libc_name:
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.directory = directory
+        self._fd = self._libc.inotify_init()
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init failed")
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MODIFY
+        if self._libc.inotify_add_watch(self._fd, os.fsencode(directory), mask) < 0:
+            os.close(self._fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+
+    def changes(self, timeout: float) -> List[str]:
+        """Names of the files that changed, waits at most `timeout` seconds."""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+        data = os.read(self._fd, 64 * 1024)
+        names = []
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if name:
+                names.append(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Fallback watcher that compares directory listings."""
+
+    def __init__(self, directory: str, interval: float = 2.0):
+        self.directory = directory
+        self.interval = interval
+        self._seen: Dict[str, Tuple[int, float]] = {}
+
+    def changes(self, timeout: float) -> List[str]:
+        time.sleep(min(timeout, self.interval))
+        names = []
+        current = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    stat = entry.stat()
+                    current[entry.name] = (stat.st_size, stat.st_mtime)
+                    if self._seen.get(entry.name) != current[entry.name]:
+                        names.append(entry.name)
+        self._seen = current
+        return names
+
+    def close(self):
+        pass
+
+
+def make_watcher(directory: str, polling: bool = False):
+    if not polling:
+        try:
+            return InotifyWatcher(directory)
+        except OSError as e:
+            print(f"inotify not available ({e}), falling back to polling")
+    return PollingWatcher(directory)
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ProcessedLedger:
+    """JSON record of processed files by content hash.
+
+    Failed files are recorded with their number of attempts and the time of
+    the next retry, so an outage doesn't drop a report for good.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f)
+
+    def __contains__(self, digest: str) -> bool:
+        with self._lock:
+            return digest in self._entries
+
+    def get(self, digest: str) -> Optional[dict]:
+        with self._lock:
+            return self._entries.get(digest)
+
+    def due_retries(self, max_attempts: int) -> List[str]:
+        """Names of failed files whose retry time has passed."""
+        now = time.time()
+        with self._lock:
+            return [entry["file"] for entry in self._entries.values()
+                    if entry.get("status") == "failed" and entry.get("attempts", 1) < max_attempts
+                    and entry.get("retry_at", 0) <= now]
+
+    def record(self, digest: str, entry: dict):
+        with self._lock:
+            self._entries[digest] = entry
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+def process_pdf(path: str) -> dict:
+    with open(path, "rb") as f:
+        return extractor_to_dict(analyse_pdf(f))
+
+
+def process_text_report(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return parse_moc_report(f.read())
+
+
+HANDLERS: Dict[str, Callable[[str], dict]] = {
+    ".pdf": process_pdf,
+    ".txt": process_text_report,
+}
+
+
+class InboxDaemon:
+    """Watches `inbox_dir`, waits until files stop changing and hands them to a worker pool.
+
+    The work queue is bounded: when the workers fall behind, the watcher loop
+    blocks instead of piling up files in memory.
+    """
+
+    def __init__(self, inbox_dir: str, results_dir: Optional[str] = None, ledger_path: Optional[str] = None,
+                 workers: int = 2, queue_size: int = 8, settle_seconds: float = 2.0, polling: bool = False,
+                 max_attempts: int = 5, retry_delay: float = 60.0):
+        self.inbox_dir = inbox_dir
+        # a failed file is retried after retry_delay, doubling every attempt, at most max_attempts times
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.results_dir = results_dir or RESULTS_DIR
+        os.makedirs(self.results_dir, exist_ok=True)
+        self.ledger = ProcessedLedger(ledger_path or os.path.join(self.results_dir, "processed.json"))
+        self.settle_seconds = settle_seconds
+        self.watcher = make_watcher(inbox_dir, polling)
+        self._queue: "queue.Queue[Optional[Tuple[str, str]]]" = queue.Queue(maxsize=queue_size)
+        self._workers = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        # path -> (size, mtime, time the file last changed)
+        self._pending: Dict[str, Tuple[int, float, float]] = {}
+        self._queued: set = set()
+        self._stop = threading.Event()
+
+    def _watch(self, names: Iterable[str]):
+        for name in names:
+            path = os.path.join(self.inbox_dir, name)
+            if os.path.splitext(name)[1].lower() in HANDLERS and not name.startswith("."):
+                self._pending.setdefault(path, (-1, -1.0, time.monotonic()))
+
+    def _settled(self) -> List[str]:
+        """Pending files whose size and mtime didn't change for settle_seconds."""
+        ready = []
+        now = time.monotonic()
+        for path, (size, mtime, changed_at) in list(self._pending.items()):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                del self._pending[path]
+                continue
+            if (stat.st_size, stat.st_mtime) != (size, mtime):
+                self._pending[path] = (stat.st_size, stat.st_mtime, now)
+            elif now - changed_at >= self.settle_seconds:
+                del self._pending[path]
+                ready.append(path)
+        return ready
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            path, digest = item
+            started = time.perf_counter()
+            entry = {"file": os.path.basename(path), "processed_at": datetime.now().isoformat(timespec="seconds")}
+            try:
+                result = HANDLERS[os.path.splitext(path)[1].lower()](path)
+                stem = os.path.splitext(os.path.basename(path))[0]
+                result_path = os.path.join(self.results_dir, f"{stem}_{digest[:12]}.json")
+                with open(result_path, "w", encoding="utf-8") as f:
+                    json.dump(result, f, indent=2)
+                entry.update(status="done", result=result_path)
+                print(f"✅ {entry['file']} processed in {time.perf_counter() - started:.1f}s")
+            except Exception as e:
+                previous = self.ledger.get(digest) or {}
+                attempts = previous.get("attempts", 0) + 1
+                entry.update(status="failed", error=str(e), attempts=attempts,
+                             retry_at=time.time() + self.retry_delay * 2 ** (attempts - 1))
+                retry = "will be retried" if attempts < self.max_attempts else "giving up"
+                print(f"❌ {entry['file']} (attempt {attempts}, {retry}): {e}")
+            self.ledger.record(digest, entry)
+            self._queued.discard(digest)
+            self._queue.task_done()
+
+    def _needs_processing(self, digest: str) -> bool:
+        entry = self.ledger.get(digest)
+        if entry is None:
+            return True
+        return (entry.get("status") == "failed" and entry.get("attempts", 1) < self.max_attempts
+                and entry.get("retry_at", 0) <= time.time())
+
+    def _dispatch(self, path: str):
+        try:
+            digest = file_hash(path)
+        except FileNotFoundError:
+            return
+        if digest in self._queued or not self._needs_processing(digest):
+            return
+        self._queued.add(digest)
+        # blocks while the queue is full, that is the back-pressure
+        self._queue.put((path, digest))
+
+    def run(self):
+        for worker in self._workers:
+            worker.start()
+        # pick up files that arrived while the daemon was down
+        self._watch(os.listdir(self.inbox_dir))
+        print(f"Watching {self.inbox_dir} ({type(self.watcher).__name__})")
+        try:
+            while not self._stop.is_set():
+                self._watch(self.watcher.changes(timeout=min(1.0, self.settle_seconds)))
+                for path in self._settled():
+                    self._dispatch(path)
+                for name in self.ledger.due_retries(self.max_attempts):
+                    self._dispatch(os.path.join(self.inbox_dir, name))
+        finally:
+            for _ in self._workers:
+                self._queue.put(None)
+            for worker in self._workers:
+                worker.join()
+            self.watcher.close()
+
+    def stop(self):
+        self._stop.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Process incoming report files from an inbox folder")
+    parser.add_argument("inbox", help="folder to watch")
+    parser.add_argument("--results", default=None, help="folder for the JSON results")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--queue-size", type=int, default=8)
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds a file must be unchanged")
+    parser.add_argument("--poll", action="store_true", help="use polling instead of inotify")
+    parser.add_argument("--max-attempts", type=int, default=5, help="attempts for a file that fails")
+    parser.add_argument("--retry-delay", type=float, default=60.0, help="seconds before the first retry")
+    args = parser.parse_args(argv)
+
+    daemon = InboxDaemon(args.inbox, args.results, workers=args.workers, queue_size=args.queue_size,
+                         settle_seconds=args.settle, polling=args.poll,
+                         max_attempts=args.max_attempts, retry_delay=args.retry_delay)
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        daemon.stop()
+
+
+if __name__ == "__main__":
+    main()
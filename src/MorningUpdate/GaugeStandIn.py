@@ -0,0 +1,103 @@
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+from urllib.parse import unquote
+
+
+class LocalGaugeServer:
+    """Small local HTTP server that serves gauge data in the PEGELONLINE layout.
+
+    Meant as a stand-in for PegelOnlineProvider in tests and offline runs:
+
+        with LocalGaugeServer({"KAUB": (120, [118, 115, 112, 110])}) as server:
+            provider = PegelOnlineProvider(base_url=server.base_url)
+
+    Every station maps to (current level, list of daily forecast levels).
+    Responses carry an ETag so conditional requests get a 304.
+    """
+
+    def __init__(self, levels: Dict[str, Tuple[float, List[float]]], latency: float = 0.0, port: int = 0):
+        self.levels = levels
+        self.latency = latency
+        self.request_count = 0
+        self.not_modified_count = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _payload(self, path: str):
+        # stations/{id}/W/currentmeasurement.json or stations/{id}/WV/measurements.json
+        parts = [unquote(p) for p in path.strip("/").split("?")[0].split("/")]
+        if len(parts) != 4 or parts[0] != "stations" or parts[1] not in self.levels:
+            return None
+        current, forecast = self.levels[parts[1]]
+        now = datetime.now().astimezone().replace(microsecond=0)
+        if parts[2] == "W" and parts[3] == "currentmeasurement.json":
+            return {"timestamp": now.isoformat(), "value": current}
+        if parts[2] == "WV" and parts[3] == "measurements.json":
+            return [{"timestamp": (now + timedelta(days=i + 1)).isoformat(), "value": value}
+                    for i, value in enumerate(forecast)]
+        return None
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server._lock:
+                    server.request_count += 1
+                if server.latency:
+                    time.sleep(server.latency)
+
+                payload = server._payload(self.path)
+                if payload is None:
+                    self.send_error(404)
+                    return
+
+                # the etag only depends on the value, not on the timestamps
+                values = payload["value"] if isinstance(payload, dict) else [p["value"] for p in payload]
+                etag = '"' + hashlib.sha1(json.dumps(values).encode()).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    with server._lock:
+                        server.not_modified_count += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+
+                body = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
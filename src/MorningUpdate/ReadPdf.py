@@ -1,146 +1,233 @@
 import pandas as pd
 import pdfplumber
+import PyPDF2
 import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from src.OpenAi import get_setting, summarize_pdf_text
+from src.MorningUpdate.Summarizer import summarize_text_local
+
+
+@dataclass(frozen=True)
+class ReportLayout:
+    """Describes where a table lives in a report and how its lines look."""
+    name: str
+    line_text_start: str
+    line_text_end: str
+    # pages that may contain the table, None means every page
+    pages: Optional[Tuple[int, ...]] = None
+    # lines containing one of these are left out of the table
+    skip_tokens: Tuple[str, ...] = ()
+    # name of the location column and of the value column
+    columns: Tuple[str, str] = ('location', 'avg price')
+
+    def index_terms(self) -> List[str]:
+        """Words of the start marker used to look the table up in the text index."""
+        return [w.lower() for w in re.findall(r"[A-Za-z]{3,}", self.line_text_start)]
+
+
+# registry of known report layouts, the first layout found in a pdf sets type_report
+REPORT_LAYOUTS: Dict[str, ReportLayout] = {}
+
+
+def register_layout(layout: ReportLayout):
+    REPORT_LAYOUTS[layout.name] = layout
+
+
+register_layout(ReportLayout(
+    name="Rhine",
+    line_text_start="Duisburg [€/mton]",
+    line_text_end="Basle [€/mton]",
+    skip_tokens=("CHF",),
+))
+register_layout(ReportLayout(
+    name="ARA",
+    line_text_start="ARA CROSS HARBOR",
+    line_text_end="GHENT AMSTERDAM",
+))
+
+
+def build_text_index(pdf_source) -> List[str]:
+    """Cheap lowercase text of every page, used to find candidate pages.
+
+    PyPDF2 skips the layout analysis pdfplumber does, so this is much faster
+    than extracting every page with pdfplumber.
+    """
+    reader = PyPDF2.PdfReader(pdf_source)
+    index = []
+    for page in reader.pages:
+        try:
+            index.append((page.extract_text() or "").lower())
+        except Exception:
+            # unreadable for PyPDF2, keep it as candidate for every layout
+            index.append(None)
+    return index
+
+
+def parse_table_lines(lines: List[str], columns: Tuple[str, str] = ('location', 'avg price')) -> pd.DataFrame:
+    """Turn table lines like 'Duisburg [€/mton] 12.50' into a location/value dataframe."""
+    locations = []
+    values = []
+    for line in lines:
+        # the price is the first number in the line
+        match = re.search(r"([\d,]+\.?\d*)", line)
+        # Extract location (text before the euro sign)
+        euro_match = re.search(r"(.+?)\s*€", line)
+        location = euro_match.group(1).strip() if euro_match else line.split()[0]
+        # Remove brackets and their contents, then clean up extra spaces
+        location = re.sub(r'\[.*?\]', '', location).strip()
+        # Remove any remaining opening brackets
+        location = re.sub(r'\[', '', location).strip()
+        if not match:
+            raise ValueError(f"Could not extract location from line: {line}")
+        locations.append(location)
+        values.append(float(match.group(1).replace(',', '')))
+    return pd.DataFrame({columns[0]: locations, columns[1]: values})
 
-from src.OpenAi import summarize_pdf_text
 
 class GasOilExtractor:
-    
-    # standard info 
-    page_num_table = 0
-    line_text_start_data_rhine = "Duisburg [€/mton]"
-    line_text_end_data_rhine = "Basle [€/mton]"
-    line_text_start_data_ara = "ARA CROSS HARBOR"
-    line_text_end_data_ara = "GHENT AMSTERDAM"
-    
-    # info based on the report type 
-    type_report : str = "Rhine"  # or "ARA"
-
-    
-    # other types
-    raw_text_first_page : str = ""
-    
-    # data_text
-    data_text : list[str]
-    
-    # pandas dataframe of extracted tables
-    df : pd.DataFrame = pd.DataFrame(columns=['location', 'avg price'])
-    
-    # summary text
-    summary_text : str = ""
-    
-    
-    
-    
-    def __init__(self, pdf_path: str):
-        self.pdf_path = pdf_path
-        
-        # get the raw text of the first page 
-        with pdfplumber.open(self.pdf_path) as pdf:
-            first_page = pdf.pages[0]
-            self.raw_text_first_page = first_page.extract_text()
-            
-
+    """Extracts the freight tables of a barge report.
 
+    The pdf is opened once. A cheap text index selects the pages that can hold
+    one of the registered layouts and only those pages are extracted with
+    pdfplumber. Every layout found ends up in `tables`, the first one found is
+    exposed through `type_report`, `data_text` and `df` as before.
+    """
 
+    def __init__(self, pdf_path, layouts: Optional[List[ReportLayout]] = None):
+        # pdf_path can be a path or a binary file object
+        self.pdf_path = pdf_path
+        self.layouts = list(layouts) if layouts is not None else list(REPORT_LAYOUTS.values())
+
+        # info based on the report type
+        self.type_report: str = "Rhine"  # or "ARA"
+        self.data_text: List[str] = []
+        self.df: pd.DataFrame = pd.DataFrame(columns=['location', 'avg price'])
+        self.summary_text: str = ""
+        # instant local summary, also used when the OpenAI summary fails
+        self.draft_summary: str = ""
+
+        # lines and dataframes of every layout found in the pdf
+        self.table_lines: Dict[str, List[str]] = {}
+        self.tables: Dict[str, pd.DataFrame] = {}
+        # raw text of the pages extracted with pdfplumber
+        self.page_texts: Dict[int, str] = {}
+
+        self._extract_pages()
+        self.raw_text_first_page: str = self.page_texts.get(0, "")
+
+    def _candidate_pages(self, page_count: int, index: Optional[List[Optional[str]]]) -> List[int]:
+        candidates = {0}
+        for layout in self.layouts:
+            pages = layout.pages if layout.pages is not None else range(page_count)
+            pages = [p for p in pages if p < page_count]
+            if index is None:
+                # no index at all, every allowed page is a candidate
+                candidates.update(pages)
+                continue
+            terms = layout.index_terms()
+            # pages the index couldn't read stay candidates, a layout without hits adds nothing
+            candidates.update(p for p in pages
+                              if p >= len(index) or index[p] is None or all(t in index[p] for t in terms))
+        return sorted(candidates)
+
+    def _extract_pages(self):
+        try:
+            index = build_text_index(self._rewind())
+        except Exception:
+            index = None
+        with pdfplumber.open(self._rewind()) as pdf:
+            for page_num in self._candidate_pages(len(pdf.pages), index):
+                self.page_texts[page_num] = pdf.pages[page_num].extract_text() or ""
+
+    def _rewind(self):
+        if hasattr(self.pdf_path, "seek"):
+            self.pdf_path.seek(0)
+        return self.pdf_path
+
+    def _find_table(self, layout: ReportLayout) -> Optional[Tuple[int, int, List[str]]]:
+        """Return (page, line number, table lines) of the first occurrence of the layout."""
+        pages = layout.pages if layout.pages is not None else self.page_texts.keys()
+        for page_num in sorted(p for p in pages if p in self.page_texts):
+            lines = self.page_texts[page_num].split('\n')
+            for i, line in enumerate(lines):
+                if not line.startswith(layout.line_text_start):
+                    continue
+                table = []
+                for j in range(i, len(lines)):
+                    # make sure lines with a skip token are left out (e.g. CHF prices)
+                    if any(token in lines[j] for token in layout.skip_tokens):
+                        continue
+                    table.append(lines[j])
+                    if lines[j].startswith(layout.line_text_end):
+                        break
+                return page_num, i, table
+        return None
 
     def print_data_text(self):
-        """Extract raw text from PDF, page by page.
-        
-        Returns:
-            list: List of tuples containing (page_number, raw_text)
-        """
+        """Print the lines of the table used for df."""
         for line in self.data_text:
             print(line)
 
-
     def set_data_text(self):
-        
-        """Find the line that starts with 'Gasoil rate (av)' and return the line number where data starts.
-                
-        Returns:
-            int: Line number where data starts (line after the header lines)
-        """
-        # find on the first page wher the line start with the text
-        lines = self.raw_text_first_page.split('\n')
-        self.data_text = []
-        
-        for i, line in enumerate(lines):
-            
-            # check if the line start wiht the rhine star text
-            if line.startswith(self.line_text_start_data_rhine):
-                self.type_report = "Rhine"
-
-                # Start collecting data from the next line
-                for j in range(i, len(lines)):
-                    
-                    # make sure if the line has CHF in it, we skip it
-                    if "CHF" in lines[j]:
-                        continue
-                    self.data_text.append(lines[j])
-                    if lines[j].startswith(self.line_text_end_data_rhine):
-                        break
-                break
-                
-            if line.startswith(self.line_text_start_data_ara):
-                self.type_report = "ARA"
+        """Collect the table lines of every registered layout found in the pdf.
 
-                # Start collecting data from the next line
-                for j in range(i, len(lines)):
-                    self.data_text.append(lines[j])
-                    if lines[j].startswith(self.line_text_end_data_ara):
-                        break
-                break
-        
-        if not self.data_text:
+        The layout that appears first in the report becomes `type_report` and its
+        lines become `data_text`.
+        """
+        self.table_lines = {}
+        first = None
+        for layout in self.layouts:
+            found = self._find_table(layout)
+            if found is None:
+                continue
+            page_num, line_num, lines = found
+            self.table_lines[layout.name] = lines
+            if first is None or (page_num, line_num) < first[0]:
+                first = ((page_num, line_num), layout.name)
+
+        if first is None:
             raise ValueError("Could not find the start of data in the PDF. Please check the report format.")
 
-    def set_df(self):
-        
+        self.type_report = first[1]
+        self.data_text = self.table_lines[self.type_report]
 
-        for line in self.data_text:
-            # the price is the first number in the line 
-            # Extract the first number from the line using regex
-            match = re.search(r"([\d,]+\.?\d*)", line)
-            # Extract location (text before the euro sign)
-            euro_match = re.search(r"(.+?)\s*€", line)
-            location = euro_match.group(1).strip() if euro_match else line.split()[0]
-            # Remove brackets and their contents, then clean up extra spaces
-            location = re.sub(r'\[.*?\]', '', location).strip()
-            # Remove any remaining opening brackets
-            location = re.sub(r'\[', '', location).strip()
-            if match:
-                avg_price = float(match.group(1).replace(',', ''))
-                self.df = pd.concat([self.df, pd.DataFrame({'location': [location], 'avg price': [avg_price]})], ignore_index=True)
-            else:
-                raise ValueError(f"Could not extract location from line: {line}")
+    def set_df(self):
+        """Build a dataframe for every table found, `df` is the one of `type_report`."""
+        layouts = {layout.name: layout for layout in self.layouts}
+        self.tables = {name: parse_table_lines(lines, layouts[name].columns)
+                       for name, lines in self.table_lines.items()}
+        self.df = self.tables[self.type_report]
 
     def set_price_ranges(self):
-        """Add price range columns to the dataframe.
-        
-        Args:
-            lower_variance (float): Amount to subtract from avg price for minimum.
-            upper_variance (float): Amount to add to avg price for maximum.
-        """
+        """Add price range columns to the dataframe."""
         # Round down to nearest 0.10 for min price and round up to nearest 0.10 for max price
         self.df['min price'] = (self.df['avg price'] // 0.10) * 0.10
         self.df['max price'] = ((self.df['avg price'] // 0.10) + 1) * 0.10
-        
-        # add an column that will be displayed in the column on the pdf 
-        self.df['price range'] = self.df.apply(lambda row: f"EUR {row['min price']:.2f} - {row['max price']:.2f}", axis=1)
-    
-    def set_summary_text(self):
-        """Set the summary text using OpenAI to summarize the raw text of the first page."""
-        self.summary_text = summarize_pdf_text(self.raw_text_first_page)       
-       
-
-        
-        
-
-        
-        
-
-
 
+        # add an column that will be displayed in the column on the pdf
+        self.df['price range'] = self.df.apply(lambda row: f"EUR {row['min price']:.2f} - {row['max price']:.2f}", axis=1)
 
+    def set_summary_text(self, mode: Optional[str] = None):
+        """Set the summary text of the first page.
 
+        Modes (default from the SUMMARY_MODE setting):
+            "fallback": OpenAI summary, the local summary when the call fails or times out
+            "openai": OpenAI summary only
+            "local": local summary only, no network call
+        """
+        mode = mode or get_setting("SUMMARY_MODE", "fallback")
+        self.draft_summary = summarize_text_local(self.raw_text_first_page)
+        if mode == "local":
+            self.summary_text = self.draft_summary
+            return
+
+        timeout = float(get_setting("SUMMARY_TIMEOUT", "20"))
+        try:
+            self.summary_text = summarize_pdf_text(self.raw_text_first_page, timeout=timeout)
+        except Exception as e:
+            if mode == "openai":
+                raise
+            print(f"OpenAI summary failed, using the local summary: {e}")
+            self.summary_text = self.draft_summary
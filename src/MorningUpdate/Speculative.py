@@ -0,0 +1,72 @@
+import hashlib
+import io
+import threading
+from concurrent.futures import CancelledError, Executor, Future
+from typing import Dict, List, Tuple
+
+from src.MorningUpdate.ReadPdf import GasOilExtractor
+
+
+def file_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class SpeculativeAnalyser:
+    """Starts analysing uploaded pdfs in the background before anyone asks for it.
+
+    Work is keyed by the hash of the file content, so re-uploading the same file
+    reuses the running or finished analysis (a failed one is retried). Files that disappear from the
+    upload get their work cancelled: queued work never starts and running work
+    stops before its next step.
+    """
+
+    def __init__(self, executor: Executor):
+        self.executor = executor
+        self._jobs: Dict[str, Tuple[Future, threading.Event]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _analyse(data: bytes, cancel: threading.Event) -> GasOilExtractor:
+        extractor = GasOilExtractor(io.BytesIO(data))
+        for step in (extractor.set_data_text, extractor.set_df,
+                     extractor.set_price_ranges, extractor.set_summary_text):
+            if cancel.is_set():
+                raise CancelledError()
+            step()
+        return extractor
+
+    def sync(self, files: List[bytes]) -> List[str]:
+        """Make the background work match the uploaded files, returns their hashes in order."""
+        hashes = [file_hash(data) for data in files]
+        with self._lock:
+            for key in set(self._jobs) - set(hashes):
+                future, cancel = self._jobs.pop(key)
+                cancel.set()
+                future.cancel()
+            for key, data in zip(hashes, files):
+                if key not in self._jobs:
+                    cancel = threading.Event()
+                    self._jobs[key] = (self.executor.submit(self._analyse, data, cancel), cancel)
+        return hashes
+
+    def is_ready(self, key: str) -> bool:
+        with self._lock:
+            job = self._jobs.get(key)
+        return job is not None and job[0].done()
+
+    def result(self, key: str) -> GasOilExtractor:
+        """Wait for the analysis of a synced file, raises the error of the analysis if it failed.
+
+        A failed analysis is forgotten, so the next sync starts it again.
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+        if job is None:
+            raise KeyError(f"No analysis started for file {key[:12]}")
+        try:
+            return job[0].result()
+        except Exception:
+            with self._lock:
+                if self._jobs.get(key) is job:
+                    del self._jobs[key]
+            raise
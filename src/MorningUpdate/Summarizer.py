@@ -0,0 +1,113 @@
+import re
+from typing import List
+
+import numpy as np
+
+
+STOPWORDS = {
+    "the", "and", "for", "are", "was", "were", "with", "that", "this", "from", "have", "has",
+    "had", "but", "not", "its", "into", "than", "then", "there", "their", "they", "been",
+    "also", "which", "while", "will", "would", "could", "should", "about", "after", "over",
+    "per", "our", "out", "all", "any", "can", "more", "some", "such", "very",
+}
+
+# words that mark market commentary in the freight reports
+FREIGHT_TERMS = {
+    "freight", "rate", "rates", "barge", "barges", "demand", "supply", "tonnage", "water",
+    "level", "levels", "rhine", "ara", "market", "gasoil", "diesel", "firm", "firmer",
+    "soft", "softer", "steady", "stable", "increase", "decrease", "rise", "fall",
+}
+
+
+def _is_table_line(line: str) -> bool:
+    """Rate table rows and headings are short, numeric or title cased, commentary is not."""
+    if "€" in line or "/mton" in line or "CHF" in line:
+        return True
+    words = line.split()
+    if not words:
+        return True
+    numeric = sum(bool(re.fullmatch(r"[-+]?[\d.,%]+", w)) for w in words)
+    if numeric / len(words) > 0.3:
+        return True
+    # headings: short or title cased, without closing punctuation
+    if not line.rstrip().endswith((".", "!", "?", ",")):
+        capitalized = sum(w[0].isupper() or w[0].isdigit() for w in words)
+        return (len(words) <= 4 and words[0][0].isupper()) or capitalized / len(words) > 0.6
+    return False
+
+
+def split_sentences(text: str) -> List[str]:
+    """Commentary sentences of a freight report page, without the rate tables."""
+    paragraphs = []
+    current = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or _is_table_line(line):
+            if current:
+                paragraphs.append(" ".join(current))
+                current = []
+            continue
+        # pdf text wraps sentences over several lines, glue them back together
+        current.append(line)
+    if current:
+        paragraphs.append(" ".join(current))
+
+    sentences = []
+    for paragraph in paragraphs:
+        for sentence in re.split(r"(?<=[.!?])\s+(?=[A-Z])", paragraph):
+            sentence = sentence.strip()
+            if len(sentence.split()) >= 5:
+                sentences.append(sentence)
+    return sentences
+
+
+def _tokens(sentence: str) -> List[str]:
+    return [w for w in re.findall(r"[a-z]{3,}", sentence.lower()) if w not in STOPWORDS]
+
+
+def summarize_text_local(text: str, num_sentences: int = 3, damping: float = 0.85) -> str:
+    """Extractive summary: TextRank over TF-IDF sentence vectors.
+
+    The best `num_sentences` sentences are returned in the order of the report.
+    Runs in a few milliseconds, so it can be used as draft or as fallback for
+    the OpenAI summary.
+    """
+    sentences = split_sentences(text)
+    if len(sentences) <= num_sentences:
+        return " ".join(sentences)
+
+    tokenized = [_tokens(s) for s in sentences]
+    vocabulary = {w: i for i, w in enumerate(sorted({w for tokens in tokenized for w in tokens}))}
+    if not vocabulary:
+        return " ".join(sentences[:num_sentences])
+
+    tf = np.zeros((len(sentences), len(vocabulary)))
+    for row, tokens in enumerate(tokenized):
+        for w in tokens:
+            tf[row, vocabulary[w]] += 1
+    idf = np.log(len(sentences) / (1 + (tf > 0).sum(axis=0))) + 1
+    tfidf = tf * idf
+    norms = np.linalg.norm(tfidf, axis=1, keepdims=True)
+    tfidf = np.divide(tfidf, norms, out=np.zeros_like(tfidf), where=norms > 0)
+
+    similarity = tfidf @ tfidf.T
+    np.fill_diagonal(similarity, 0)
+    row_sums = similarity.sum(axis=1, keepdims=True)
+    transition = np.divide(similarity, row_sums, out=np.full_like(similarity, 1 / len(sentences)),
+                           where=row_sums > 0)
+
+    scores = np.full(len(sentences), 1 / len(sentences))
+    for _ in range(50):
+        new_scores = (1 - damping) / len(sentences) + damping * transition.T @ scores
+        if np.abs(new_scores - scores).sum() < 1e-6:
+            scores = new_scores
+            break
+        scores = new_scores
+
+    # the commentary leads with the market view, and freight words matter most
+    position_bonus = 1 + 0.5 / (1 + np.arange(len(sentences)))
+    term_bonus = np.array([1 + 0.1 * sum(w in FREIGHT_TERMS for w in set(tokens)) for tokens in tokenized])
+    scores = scores * position_bonus * term_bonus
+
+    best = sorted(np.argsort(-scores)[:num_sentences])
+    return " ".join(sentences[i] for i in best)
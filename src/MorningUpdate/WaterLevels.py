@@ -0,0 +1,238 @@
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import pandas as pd
+import requests
+
+
+# stations shown in the barging report, display name -> gauge id used by the provider
+RHINE_STATIONS: Dict[str, str] = {
+    "Ruhrort": "DUISBURG-RUHRORT",
+    "Cologne": "KÖLN",
+    "Kaub": "KAUB",
+    "Maxau": "MAXAU",
+}
+
+FORECAST_DAYS = 4
+
+# column names used by the streamlit editor and TradeReportPDF.add_rhine_water_levels
+COLUMN_STATION = "Station"
+COLUMN_CURRENT = "Current (cm)"
+COLUMN_FORECAST = f"{FORECAST_DAYS} day - Forecast (cm)"
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
+
+
+@dataclass
+class GaugeReading:
+    station: str
+    current_cm: Optional[float]
+    forecast_cm: Optional[float]
+    timestamp: Optional[str]
+
+
+class GaugeProvider(ABC):
+    """Base class for a source of gauge data.
+
+    Subclasses only have to implement the two fetch methods, everything else
+    (concurrency, storage, the dataframe layout) lives in this module.
+    """
+
+    @abstractmethod
+    def fetch_current(self, gauge_id: str) -> Tuple[Optional[float], Optional[str]]:
+        """Return the current level in cm and the timestamp of the measurement."""
+
+    @abstractmethod
+    def fetch_forecast(self, gauge_id: str, days: int = FORECAST_DAYS) -> Optional[float]:
+        """Return the forecasted level in cm `days` ahead, or None if there is no forecast."""
+
+
+@dataclass
+class _CacheEntry:
+    payload: object
+    fetched_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class PegelOnlineProvider(GaugeProvider):
+    """Gauge data from the PEGELONLINE REST api (or anything serving the same layout).
+
+    Responses are cached for `ttl_seconds`. After that the cached response is
+    revalidated with If-None-Match / If-Modified-Since, so an unchanged gauge
+    only costs a 304.
+    """
+
+    BASE_URL = "https://www.pegelonline.wsv.de/webservices/rest-api/v2"
+
+    def __init__(self, base_url: Optional[str] = None, ttl_seconds: float = 900, timeout: float = 10):
+        self.base_url = (base_url or self.BASE_URL).rstrip("/")
+        self.ttl_seconds = ttl_seconds
+        self.timeout = timeout
+        self._cache: Dict[str, _CacheEntry] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        # requests sessions are not thread safe, so keep one per worker thread
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            self._local.session = session
+        return session
+
+    def _get_json(self, path: str):
+        url = f"{self.base_url}/{path}"
+        with self._lock:
+            entry = self._cache.get(url)
+        if entry and time.monotonic() - entry.fetched_at < self.ttl_seconds:
+            return entry.payload
+
+        headers = {}
+        if entry and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+        response = self._session().get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and entry:
+            entry.fetched_at = time.monotonic()
+            return entry.payload
+        response.raise_for_status()
+
+        entry = _CacheEntry(
+            payload=response.json(),
+            fetched_at=time.monotonic(),
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+        with self._lock:
+            self._cache[url] = entry
+        return entry.payload
+
+    def fetch_current(self, gauge_id: str) -> Tuple[Optional[float], Optional[str]]:
+        data = self._get_json(f"stations/{quote(gauge_id)}/W/currentmeasurement.json")
+        return data.get("value"), data.get("timestamp")
+
+    def fetch_forecast(self, gauge_id: str, days: int = FORECAST_DAYS) -> Optional[float]:
+        # WV is the forecast time series, not every gauge publishes one
+        try:
+            data = self._get_json(f"stations/{quote(gauge_id)}/WV/measurements.json")
+        except requests.HTTPError:
+            return None
+        if not data:
+            return None
+
+        target = datetime.now().astimezone().timestamp() + days * 24 * 3600
+        best = None
+        for point in data:
+            try:
+                point_time = datetime.fromisoformat(point["timestamp"]).timestamp()
+            except (KeyError, ValueError):
+                continue
+            if point_time <= target:
+                best = point
+        # the forecast may end before the target date, then use the last point
+        best = best or data[-1]
+        return best.get("value")
+
+
+def fetch_readings(provider: GaugeProvider,
+                   stations: Dict[str, str] = RHINE_STATIONS,
+                   forecast_days: int = FORECAST_DAYS,
+                   max_workers: int = 8) -> List[GaugeReading]:
+    """Fetch the current and forecast level of all stations concurrently.
+
+    A station that fails to load gets None values instead of failing the whole table.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        current_futures = {name: executor.submit(provider.fetch_current, gauge_id)
+                           for name, gauge_id in stations.items()}
+        forecast_futures = {name: executor.submit(provider.fetch_forecast, gauge_id, forecast_days)
+                            for name, gauge_id in stations.items()}
+
+        readings = []
+        for name in stations:
+            try:
+                current, timestamp = current_futures[name].result()
+            except Exception as e:
+                print(f"Could not fetch current level for {name}: {e}")
+                current, timestamp = None, None
+            try:
+                forecast = forecast_futures[name].result()
+            except Exception as e:
+                print(f"Could not fetch forecast for {name}: {e}")
+                forecast = None
+            readings.append(GaugeReading(station=name, current_cm=current,
+                                         forecast_cm=forecast, timestamp=timestamp))
+    return readings
+
+
+def readings_to_df(readings: List[GaugeReading]) -> pd.DataFrame:
+    return pd.DataFrame({
+        COLUMN_STATION: [r.station for r in readings],
+        COLUMN_CURRENT: [r.current_cm for r in readings],
+        COLUMN_FORECAST: [r.forecast_cm for r in readings],
+    })
+
+
+class WaterLevelStore:
+    """Stores the latest water level table and an append-only history in the data folder.
+
+    Both files are runtime data and ignored by git.
+    """
+
+    def __init__(self, data_dir: Optional[str] = None):
+        data_dir = data_dir or os.environ.get("WATER_LEVEL_DATA_DIR", DATA_DIR)
+        self.latest_path = os.path.join(data_dir, "rhine_water_levels_latest.json")
+        self.history_path = os.path.join(data_dir, "rhine_water_levels_history.jsonl")
+        self._lock = threading.Lock()
+        os.makedirs(data_dir, exist_ok=True)
+
+    def load_latest(self) -> pd.DataFrame:
+        if not os.path.exists(self.latest_path):
+            return readings_to_df([GaugeReading(name, None, None, None) for name in RHINE_STATIONS])
+        with open(self.latest_path, "r", encoding="utf-8") as f:
+            return pd.DataFrame(json.load(f))
+
+    def save(self, readings: List[GaugeReading]):
+        df = readings_to_df(readings)
+        fetched_at = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            df.to_json(self.latest_path)
+            with open(self.history_path, "a", encoding="utf-8") as f:
+                for r in readings:
+                    f.write(json.dumps({
+                        "fetched_at": fetched_at,
+                        "station": r.station,
+                        "current_cm": r.current_cm,
+                        "forecast_cm": r.forecast_cm,
+                        "forecast_days": FORECAST_DAYS,
+                        "measured_at": r.timestamp,
+                    }) + "\n")
+
+    def load_history(self) -> pd.DataFrame:
+        if not os.path.exists(self.history_path):
+            return pd.DataFrame()
+        return pd.read_json(self.history_path, lines=True)
+
+
+def get_water_levels(provider: GaugeProvider, store: Optional[WaterLevelStore] = None) -> pd.DataFrame:
+    """Fetch the water level table and record it in the store.
+
+    Falls back to the last stored table when none of the stations could be fetched.
+    """
+    store = store or WaterLevelStore()
+    readings = fetch_readings(provider)
+    if all(r.current_cm is None for r in readings):
+        return store.load_latest()
+    store.save(readings)
+    return readings_to_df(readings)
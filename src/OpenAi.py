@@ -1,68 +1,226 @@
 import os
-from typing import List
-from openai import OpenAI
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+from openai import APIError, OpenAI
 import json
 from .models import Trade, Offers_Bids, Windows, OverView, RawTradeText
 import streamlit as st
 
 
-openai_key = st.secrets["OPENAI_API_KEY"]
+def get_setting(name: str, default: Optional[str] = None) -> Optional[str]:
+    """Read a setting from the streamlit secrets, or from the environment for headless runs."""
+    try:
+        return st.secrets[name]
+    except Exception:
+        return os.environ.get(name, default)
 
 
+_client: Optional[OpenAI] = None
+_client_lock = threading.Lock()
 
-client = OpenAI(
-    # This is the default and can be omitted
-    api_key=openai_key,
+
+def get_client() -> OpenAI:
+    """The shared OpenAI client, created on first use so the module imports without credentials."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OpenAI(api_key=get_setting("OPENAI_API_KEY"))
+        return _client
+
+
+TRADE_SYSTEM_PROMPT = (
+    "You are an AI that transforms raw trade text into structured JSON objects.\n"
+    "Your output must be strictly valid JSON — no markdown, no explanations.\n"
+    "Every trade in the input text must be one JSON object in an array.\n"
+    "You must detect trade boundaries yourself, even if trades are not separated by new lines.\n"
+    "Schema for each trade:\n"
+    "{\n"
+    '  "date": "string or null",\n'
+    '  "product": "string",\n'
+    '  "price": float or null, // always extract numeric value, may be negative, may be prefixed by $ or -\n'
+    '  "volume_kt": float or null,\n'
+    '  "buyer": "string or null // always the second company mentioned in a trade, never FE, MW, BE"\n'
+    '  "seller": "string or null // always the first company mentioned in a trade, never FE, MW, BE"\n'
+    '  "window": "string or null", // must be one of: "FE", "MW", "BE"\n'
+    '  "raw_text": "string"\n'
+    "}\n\n"
+    "Rules:\n"
+    "1. Always use the provided 'date' and 'product' values for every trade.\n"
+    "2. Extract 'window' exactly as 'FE', 'MW', or 'BE' from the trade line, or null if missing.\n"
+    "3. Include the exact original text for that trade in 'raw_text'.\n"
+    "4. Use null for any field where information is not present.\n"
+    "5. The number of JSON objects must equal the number of detected trades in the text.\n"
+    "6. Do not include any text outside the JSON output.\n"
+    "7. If type is equal to is trade than there are always two companies involved the first company is the seller and the second companay is the buyer\n"
+    "8. If type is equal to: last bid it ALWAYS includes an buyer and NO seller make seller equal to null \n"
+    "9. If type is equal to: last offer it ALWAYS includes an seller and NO buyer make buyer equal to null \n"
 )
 
-def extract_trades_from_rawtext(raw_trade: RawTradeText, date: str) -> List[Trade]:
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {
-                "role": "system",
-                "content": (
-                    "You are an AI that transforms raw trade text into structured JSON objects.\n"
-                    "Your output must be strictly valid JSON — no markdown, no explanations.\n"
-                    "Every trade in the input text must be one JSON object in an array.\n"
-                    "You must detect trade boundaries yourself, even if trades are not separated by new lines.\n"
-                    "Schema for each trade:\n"
-                    "{\n"
-                    '  "date": "string or null",\n'
-                    '  "product": "string",\n'
-                    '  "price": float or null, // always extract numeric value, may be negative, may be prefixed by $ or -\n'
-                    '  "volume_kt": float or null,\n'
-                    '  "buyer": "string or null // always the second company mentioned in a trade, never FE, MW, BE"\n'
-                    '  "seller": "string or null // always the first company mentioned in a trade, never FE, MW, BE"\n'
-                    '  "window": "string or null", // must be one of: "FE", "MW", "BE"\n'
-                    '  "raw_text": "string"\n'
-                    "}\n\n"
-                    "Rules:\n"
-                    "1. Always use the provided 'date' and 'product' values for every trade.\n"
-                    "2. Extract 'window' exactly as 'FE', 'MW', or 'BE' from the trade line, or null if missing.\n"
-                    "3. Include the exact original text for that trade in 'raw_text'.\n"
-                    "4. Use null for any field where information is not present.\n"
-                    "5. The number of JSON objects must equal the number of detected trades in the text.\n"
-                    "6. Do not include any text outside the JSON output.\n"
-                    "7. If type is equal to is trade than there are always two companies involved the first company is the seller and the second companay is the buyer\n"
-                    "8. If type is equal to: last bid it ALWAYS includes an buyer and NO seller make seller equal to null \n"
-                    "9. If type is equal to: last offer it ALWAYS includes an seller and NO buyer make buyer equal to null \n"
-                )
-            },
-            {
-                "role": "user",
-                "content": (
-                    f"Date: {date}\n"
-                    f"Product: {raw_trade.product}\n"
-                    f"Raw text:\n{raw_trade.text}\n"
-                    f"Type: {raw_trade.type}\n"
-                )
+SUMMARY_SYSTEM_PROMPT = (
+    "You are an AI that creates concise summaries of PDF text content.\n"
+    "Your output should be a clear, informative summary that captures the key points and main themes of the document.\n"
+    "Keep the summary focused and relevant to the document's content.\n"
+    "Provide only the summary text without any additional formatting or explanations. Make it only 3 sentences\n"
+)
+
+
+# === Model routing ===
+
+# a trade line with a price, a volume and a window, e.g. "Shell / BP 2kt $-1.38 FE"
+_PRICE_PATTERN = re.compile(r"\$\s*-?\d+(?:\.\d+)?")
+_VOLUME_PATTERN = re.compile(r"\d+(?:\.\d+)?\s*kt", re.IGNORECASE)
+_WINDOW_PATTERN = re.compile(r"\b(FE|MW|BE)\b")
+# ParsedReport strips "last bid" / "last offer" off a line, what is left is a participant
+# name with an optional price, volume and window, e.g. "Vitol 2kt $-1.38 MW"
+_PARTICIPANT_PATTERN = re.compile(
+    r"^[A-Za-z][\w&.\- ]*?(?:\s*(?:\$\s*-?\d+(?:\.\d+)?|\d+(?:\.\d+)?\s*(?i:kt)|\b(?:FE|MW|BE)\b))*\s*$")
+
+
+def parse_confidence(raw_trade: RawTradeText) -> float:
+    """Share of lines (0-1) that the regexes can fully explain."""
+    lines = [line.strip() for line in raw_trade.text.splitlines() if line.strip()]
+    if not lines:
+        return 0.0
+    confident = 0
+    for line in lines:
+        if raw_trade.type in ("last bid", "last offer"):
+            confident += bool(_PARTICIPANT_PATTERN.match(line))
+        else:
+            confident += bool(_PRICE_PATTERN.search(line) and _VOLUME_PATTERN.search(line)
+                              and _WINDOW_PATTERN.search(line))
+    return confident / len(lines)
+
+
+def score_trade_text(raw_trade: RawTradeText) -> float:
+    """Complexity score of a trade block, higher means a bigger model is needed."""
+    lines = [line for line in raw_trade.text.splitlines() if line.strip()]
+    return len(lines) + len(raw_trade.text) / 200 + 3 * (1 - parse_confidence(raw_trade))
+
+
+def score_summary_text(pdf_text: str) -> float:
+    lines = [line for line in pdf_text.splitlines() if line.strip()]
+    return len(lines) / 10 + len(pdf_text) / 1000
+
+
+@dataclass
+class ModelRoute:
+    """A model and the highest complexity score it is used for, with its counters."""
+    name: str
+    model: str
+    max_score: float
+    calls: int = 0
+    failures: int = 0
+    escalations: int = 0
+    total_latency: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def record(self, latency: float, ok: bool, escalated: bool = False):
+        with self._lock:
+            self.calls += 1
+            self.total_latency += latency
+            if not ok:
+                self.failures += 1
+            if escalated:
+                self.escalations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "model": self.model,
+                "max_score": self.max_score,
+                "calls": self.calls,
+                "failures": self.failures,
+                "escalations": self.escalations,
+                "avg_latency_s": self.total_latency / self.calls if self.calls else None,
+                "accuracy": 1 - self.failures / self.calls if self.calls else None,
             }
-        ],
 
-    )
 
-    json_result = json.loads(response.choices[0].message.content)
+class ModelRouter:
+    """Sends each request to the smallest route whose max_score covers it.
+
+    When the answer of a route fails validation, or the api call for it fails,
+    the request is retried on the next (bigger) route, the last route is used
+    as it is.
+    """
+
+    def __init__(self, routes: List[ModelRoute]):
+        self.routes = sorted(routes, key=lambda r: r.max_score)
+
+    def route_for(self, score: float) -> int:
+        for i, route in enumerate(self.routes):
+            if score <= route.max_score:
+                return i
+        return len(self.routes) - 1
+
+    def run(self, score: float, call: Callable[[str], object], validate: Callable[[object], bool]):
+        start_index = self.route_for(score)
+        result = None
+        for i in range(start_index, len(self.routes)):
+            route = self.routes[i]
+            started = time.perf_counter()
+            api_error = None
+            try:
+                result = call(route.model)
+                ok = validate(result)
+            except APIError as e:
+                # model unavailable, rate limited, timed out, ...
+                print(f"Model {route.model} failed: {e}")
+                result, ok, api_error = None, False, e
+            except (json.JSONDecodeError, AttributeError, TypeError, ValueError) as e:
+                print(f"Model {route.model} gave an unusable answer: {e}")
+                result, ok = None, False
+            is_last = i == len(self.routes) - 1
+            route.record(time.perf_counter() - started, ok, escalated=not ok and not is_last)
+            if ok or is_last:
+                if api_error is not None:
+                    raise api_error
+                if result is None:
+                    raise ValueError(f"No valid answer from any model, last tried {route.model}")
+                return result
+
+    def stats(self) -> Dict[str, dict]:
+        return {route.name: route.stats() for route in self.routes}
+
+
+def _default_routes(max_score_setting: str, default_max_score: str) -> List[ModelRoute]:
+    return [
+        ModelRoute("small", get_setting("OPENAI_SMALL_MODEL", "gpt-4o-mini"),
+                   float(get_setting(max_score_setting, default_max_score))),
+        ModelRoute("large", get_setting("OPENAI_LARGE_MODEL", "gpt-4o"), float("inf")),
+    ]
+
+
+# a single clean trade line scores about 1, a one page freight report about 5
+trade_router = ModelRouter(_default_routes("OPENAI_TRADE_SMALL_MAX_SCORE", "3"))
+summary_router = ModelRouter(_default_routes("OPENAI_SUMMARY_SMALL_MAX_SCORE", "8"))
+
+
+# === Trades ===
+
+def build_trade_messages(raw_trade: RawTradeText, date: str) -> List[dict]:
+    return [
+        {
+            "role": "system",
+            "content": TRADE_SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": (
+                f"Date: {date}\n"
+                f"Product: {raw_trade.product}\n"
+                f"Raw text:\n{raw_trade.text}\n"
+                f"Type: {raw_trade.type}\n"
+            )
+        }
+    ]
+
+
+def parse_trades_response(content: str, raw_trade: RawTradeText) -> List[Trade]:
+    json_result = json.loads(content)
     trades = []
     for trade_dict in json_result:
         trades.append(Trade(
@@ -76,28 +234,83 @@ def extract_trades_from_rawtext(raw_trade: RawTradeText, date: str) -> List[Trad
             raw_text=trade_dict.get("raw_text"),
             type=raw_trade.type  # Use the type from the raw trade
         ))
-    json_result = trades
-    return json_result
-
-
-def summarize_pdf_text(pdf_text: str) -> str:
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {
-                "role": "system",
-                "content": (
-                    "You are an AI that creates concise summaries of PDF text content.\n"
-                    "Your output should be a clear, informative summary that captures the key points and main themes of the document.\n"
-                    "Keep the summary focused and relevant to the document's content.\n"
-                    "Provide only the summary text without any additional formatting or explanations. Make it only 3 sentences\n"
-                )
-            },
-            {
-                "role": "user",
-                "content": f"Please summarize the following PDF text:\n\n{pdf_text}"
-            }
-        ],
+    return trades
+
+
+def validate_trades(trades: List[Trade], raw_trade: RawTradeText) -> bool:
+    """Check the extracted trades against the rules of the prompt."""
+    if not trades:
+        return False
+    for trade in trades:
+        if trade.window not in ("FE", "MW", "BE", None):
+            return False
+        if raw_trade.type == "last bid" and not trade.buyer:
+            return False
+        if raw_trade.type == "last offer" and not trade.seller:
+            return False
+        if raw_trade.type == "trade" and not (trade.buyer and trade.seller and trade.price is not None):
+            return False
+    return True
+
+
+def extract_trades_from_rawtext(raw_trade: RawTradeText, date: str) -> List[Trade]:
+    def call(model: str) -> List[Trade]:
+        response = get_client().chat.completions.create(
+            model=model,
+            messages=build_trade_messages(raw_trade, date),
+        )
+        return parse_trades_response(response.choices[0].message.content, raw_trade)
+
+    return trade_router.run(
+        score_trade_text(raw_trade),
+        call,
+        lambda trades: validate_trades(trades, raw_trade),
+    )
+
+
+# === Summaries ===
+
+def build_summary_messages(pdf_text: str) -> List[dict]:
+    return [
+        {
+            "role": "system",
+            "content": SUMMARY_SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": f"Please summarize the following PDF text:\n\n{pdf_text}"
+        }
+    ]
+
+
+def summarize_pdf_text(pdf_text: str, timeout: Optional[float] = None) -> str:
+    """Summary from the routed model.
+
+    With a `timeout` the call is meant to give up fast for the local fallback:
+    the timeout is the budget for all attempts together and the SDK retries are off.
+    """
+    client = get_client()
+    deadline = None
+    if timeout is not None:
+        client = client.with_options(max_retries=0)
+        deadline = time.monotonic() + timeout
+
+    def call(model: str) -> str:
+        options = {}
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"Summary timeout of {timeout}s used up before trying {model}")
+            options["timeout"] = remaining
+        response = client.chat.completions.create(
+            model=model,
+            messages=build_summary_messages(pdf_text),
+            **options,
+        )
+        return response.choices[0].message.content
+
+    return summary_router.run(
+        score_summary_text(pdf_text),
+        call,
+        lambda summary: bool(summary and summary.strip()),
     )
-    
-    return response.choices[0].message.content
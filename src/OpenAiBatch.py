@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Offline batch extraction of trades through the OpenAI Batch API.
+
+All pending RawTradeText blocks are written to one JSONL batch, submitted,
+polled and mapped back to Trade objects by custom id. Progress is kept in a
+state file, running the same job again after a crash picks up where it was.
+
+    python -m src.OpenAiBatch test/input/*.txt --state data/batch_state.json -o trades.jsonl
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import time
+from dataclasses import asdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from openai import OpenAI
+
+from src.ReportParser import ParsedReport
+from src.models import RawTradeText, Trade
+from src.OpenAi import build_trade_messages, get_setting, parse_trades_response, validate_trades
+import src.OpenAi as OpenAi
+
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+# (raw trade, report date)
+BatchItem = Tuple[RawTradeText, str]
+
+
+def pending_items(reports: Iterable[ParsedReport]) -> List[BatchItem]:
+    return [(raw_trade, report.date) for report in reports for raw_trade in report.get_trades()]
+
+
+def make_custom_id(index: int, raw_trade: RawTradeText, date: str) -> str:
+    key = "|".join([date, raw_trade.product, raw_trade.type, raw_trade.text])
+    return f"trade-{index}-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]}"
+
+
+def items_hash(custom_ids: Iterable[str]) -> str:
+    """Fingerprint of the set of trade blocks in a batch."""
+    return hashlib.sha1("\n".join(sorted(custom_ids)).encode("utf-8")).hexdigest()
+
+
+class TradeBatchJob:
+    """One batch run of extract_trades_from_rawtext over many trade blocks.
+
+    The state file records the uploaded input file, the batch id and the
+    output file, so every step is only done once even across restarts.
+    """
+
+    def __init__(self, state_path: str, client: Optional[OpenAI] = None,
+                 model: Optional[str] = None, poll_interval: float = 30):
+        self.state_path = state_path
+        self.client = client or OpenAi.get_client()
+        self.model = model or get_setting("OPENAI_BATCH_MODEL", "gpt-4o")
+        self.poll_interval = poll_interval
+        self.state = self._load_state()
+
+    def _load_state(self) -> dict:
+        if os.path.exists(self.state_path):
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {}
+
+    def _save_state(self):
+        # write to a temp file first so a crash never leaves half a state file
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def build_jsonl(self) -> bytes:
+        lines = []
+        for custom_id, item in self.state["items"].items():
+            raw_trade = RawTradeText(product=item["product"], text=item["text"], type=item["type"])
+            lines.append(json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": {"model": self.model, "messages": build_trade_messages(raw_trade, item["date"])},
+            }))
+        return "\n".join(lines).encode("utf-8")
+
+    def submit(self, items: List[BatchItem]) -> str:
+        """Upload the batch and start it, or return the batch id of the earlier run.
+
+        Raises a ValueError when the state file belongs to a run over other items.
+        """
+        new_items = {
+            make_custom_id(i, raw_trade, date): dict(asdict(raw_trade), date=date)
+            for i, (raw_trade, date) in enumerate(items)
+        }
+        if "items" in self.state:
+            state_hash = self.state.get("items_hash") or items_hash(self.state["items"])
+            if state_hash != items_hash(new_items):
+                raise ValueError(f"State file {self.state_path} belongs to a batch over other trade blocks, "
+                                 f"use another --state for this run")
+        else:
+            self.state["items"] = new_items
+            self.state["items_hash"] = items_hash(new_items)
+            self._save_state()
+
+        if self.state.get("batch_id"):
+            return self.state["batch_id"]
+
+        if not self.state.get("input_file_id"):
+            upload = self.client.files.create(
+                file=("trades_batch.jsonl", io.BytesIO(self.build_jsonl())),
+                purpose="batch",
+            )
+            self.state["input_file_id"] = upload.id
+            self._save_state()
+
+        batch = self.client.batches.create(
+            input_file_id=self.state["input_file_id"],
+            endpoint=BATCH_ENDPOINT,
+            completion_window="24h",
+        )
+        self.state["batch_id"] = batch.id
+        self.state["status"] = batch.status
+        self._save_state()
+        return batch.id
+
+    def poll(self, timeout: Optional[float] = None) -> str:
+        """Wait until the batch reaches a final status and return that status."""
+        started = time.monotonic()
+        # the file ids are only known once the batch has been retrieved in its final status
+        while self.state.get("status") not in FINAL_STATUSES or "output_file_id" not in self.state:
+            batch = self.client.batches.retrieve(self.state["batch_id"])
+            self.state["status"] = batch.status
+            self.state["output_file_id"] = batch.output_file_id
+            self.state["error_file_id"] = batch.error_file_id
+            self._save_state()
+            if batch.status in FINAL_STATUSES:
+                break
+            if timeout is not None and time.monotonic() - started > timeout:
+                raise TimeoutError(f"Batch {self.state['batch_id']} still {batch.status} after {timeout}s")
+            time.sleep(self.poll_interval)
+        return self.state["status"]
+
+    def _file_lines(self, file_key: str) -> List[str]:
+        """Lines of the batch output or error file, downloaded once and kept next to the state file."""
+        if not self.state.get(file_key):
+            # no output file when every request failed, no error file when none did
+            return []
+        local_path = f"{self.state_path}.{file_key.replace('_file_id', '')}.jsonl"
+        if not os.path.exists(local_path):
+            # download to a temp file first so a crash never leaves a truncated copy
+            tmp_path = local_path + ".tmp"
+            with self.client.files.with_streaming_response.content(self.state[file_key]) as response:
+                with open(tmp_path, "wb") as f:
+                    for chunk in response.iter_bytes():
+                        f.write(chunk)
+            os.replace(tmp_path, local_path)
+        with open(local_path, "r", encoding="utf-8") as f:
+            return [line for line in f.read().splitlines() if line.strip()]
+
+    def results(self) -> Tuple[Dict[str, List[Trade]], Dict[str, str]]:
+        """Map the batch output back to trades per custom id, plus the errors per custom id.
+
+        A block ends up in one of the two: blocks whose request failed or whose
+        answer is unusable or fails validation are only in the errors.
+        """
+        if self.state.get("status") != "completed":
+            raise ValueError(f"Batch is not completed (status: {self.state.get('status')})")
+
+        trades: Dict[str, List[Trade]] = {}
+        errors: Dict[str, str] = {}
+        for line in self._file_lines("output_file_id") + self._file_lines("error_file_id"):
+            result = json.loads(line)
+            custom_id = result["custom_id"]
+            item = self.state["items"].get(custom_id)
+            if item is None:
+                continue
+            raw_trade = RawTradeText(product=item["product"], text=item["text"], type=item["type"])
+            response = result.get("response") or {}
+            if result.get("error") or response.get("status_code") != 200:
+                errors[custom_id] = json.dumps(result.get("error") or response.get("body") or response)
+                continue
+            try:
+                content = response["body"]["choices"][0]["message"]["content"]
+                parsed = parse_trades_response(content, raw_trade)
+            except (KeyError, IndexError, ValueError) as e:
+                errors[custom_id] = f"Unusable answer: {e}"
+                continue
+            if not validate_trades(parsed, raw_trade):
+                errors[custom_id] = "Answer failed validation"
+                continue
+            trades[custom_id] = parsed
+
+        for custom_id in self.state["items"]:
+            if custom_id not in trades and custom_id not in errors:
+                errors[custom_id] = "Missing from batch output"
+        return trades, errors
+
+    def run(self, items: List[BatchItem], timeout: Optional[float] = None):
+        self.submit(items)
+        self.poll(timeout)
+        return self.results()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract trades of many MOC reports in one OpenAI batch")
+    parser.add_argument("reports", nargs="+", help="MOC text reports")
+    parser.add_argument("--state", required=True, help="state file, reuse it to resume a run")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file with the extracted trades")
+    parser.add_argument("--poll-interval", type=float, default=30)
+    args = parser.parse_args(argv)
+
+    reports = []
+    for path in args.reports:
+        with open(path, "r", encoding="utf-8") as f:
+            reports.append(ParsedReport(f.read()))
+
+    job = TradeBatchJob(args.state, poll_interval=args.poll_interval)
+    trades, errors = job.run(pending_items(reports))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        for custom_id, custom_trades in trades.items():
+            for trade in custom_trades:
+                f.write(json.dumps(dict(asdict(trade), custom_id=custom_id)) + "\n")
+
+    print(f"✅ {sum(len(t) for t in trades.values())} trades from {len(trades)} blocks written to {args.output}")
+    for custom_id, error in errors.items():
+        print(f"❌ {custom_id}: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import json
+import re
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+
+def default_responder(body: dict) -> str:
+    """Rough offline answer for the prompts in src.OpenAi.
+
+    Trade prompts get one JSON trade per input line, picked apart with regexes,
+    everything else gets a fixed summary.
+    """
+    messages = body.get("messages", [])
+    system = messages[0]["content"] if messages else ""
+    user = messages[-1]["content"] if messages else ""
+    if "raw trade text" not in system:
+        return "Barge freight rates were stable. Demand was moderate. No major changes are expected."
+
+    fields = dict(re.findall(r"^(Date|Product|Type): (.*)$", user, re.MULTILINE))
+    raw_text = user.split("Raw text:\n", 1)[-1].rsplit("\nType:", 1)[0]
+    trade_type = fields.get("Type", "trade")
+    trades = []
+    for line in (l.strip() for l in raw_text.splitlines()):
+        if not line:
+            continue
+        price = re.search(r"\$\s*(-?\d+(?:\.\d+)?)", line)
+        volume = re.search(r"(\d+(?:\.\d+)?)\s*kt", line, re.IGNORECASE)
+        window = re.search(r"\b(FE|MW|BE)\b", line)
+        names = [n.strip() for n in re.split(r"/|\bto\b|\bsells\b", line.split("$")[0]) if n.strip()]
+        names = [re.sub(r"\d+(?:\.\d+)?\s*kt", "", n, flags=re.IGNORECASE).strip() for n in names]
+        seller = names[0] if names and trade_type != "last bid" else None
+        buyer = (names[1] if len(names) > 1 else None) if trade_type == "trade" else (
+            names[0] if names and trade_type == "last bid" else None)
+        trades.append({
+            "date": fields.get("Date"),
+            "product": fields.get("Product"),
+            "price": float(price.group(1)) if price else None,
+            "volume_kt": float(volume.group(1)) if volume else None,
+            "buyer": buyer,
+            "seller": seller,
+            "window": window.group(1) if window else None,
+            "raw_text": line,
+        })
+    return json.dumps(trades)
+
+
+class LocalOpenAIServer:
+    """Local stand-in for the parts of the OpenAI api this repo uses.
+
+    Serves chat completions, file upload/download and the Batch API, so code
+    can run against it with OpenAI(api_key="test", base_url=server.base_url).
+    `responder` gets the chat completion request body and returns the message
+    content, `latency` is added to every chat completion and `batch_delay` is
+    the time a batch stays in progress. A request whose responder raises ends
+    up in the error file of its batch, like failed requests of the real api.
+    """
+
+    def __init__(self, responder: Optional[Callable[[dict], str]] = None,
+                 latency: float = 0.0, batch_delay: float = 0.0, port: int = 0):
+        self.responder = responder or default_responder
+        self.latency = latency
+        self.batch_delay = batch_delay
+        self.files: Dict[str, dict] = {}
+        self.batches: Dict[str, dict] = {}
+        self.chat_requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _completion(self, body: dict) -> dict:
+        with self._lock:
+            self.chat_requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stand-in"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": self.responder(body)},
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    def _add_file(self, filename: str, content: bytes, purpose: str) -> dict:
+        file = {
+            "id": f"file-{uuid.uuid4().hex}",
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+        with self._lock:
+            self.files[file["id"]] = dict(file, content=content)
+        return file
+
+    def _run_batch(self, batch_id: str):
+        if self.batch_delay:
+            time.sleep(self.batch_delay)
+        batch = self.batches[batch_id]
+        lines = self.files[batch["input_file_id"]]["content"].decode("utf-8").splitlines()
+        output: List[str] = []
+        failed: List[str] = []
+        for line in filter(None, lines):
+            request = json.loads(line)
+            try:
+                response = {"status_code": 200, "body": self._completion(request["body"])}
+            except Exception as e:
+                response = {"status_code": 500, "body": {"error": {"message": str(e), "type": "server_error"}}}
+            (output if response["status_code"] == 200 else failed).append(json.dumps({
+                "id": f"batch_req_{uuid.uuid4().hex}",
+                "custom_id": request["custom_id"],
+                "response": response,
+                "error": None,
+            }))
+        # like the real api, a file is only made when it has lines
+        output_file = output and self._add_file(f"{batch_id}_output.jsonl", "\n".join(output).encode("utf-8"),
+                                                "batch_output")
+        error_file = failed and self._add_file(f"{batch_id}_errors.jsonl", "\n".join(failed).encode("utf-8"),
+                                               "batch_output")
+        with self._lock:
+            batch.update(status="completed", output_file_id=output_file["id"] if output_file else None,
+                         error_file_id=error_file["id"] if error_file else None, completed_at=int(time.time()),
+                         request_counts={"total": len(output) + len(failed), "completed": len(output),
+                                         "failed": len(failed)})
+
+    def _create_batch(self, request: dict) -> dict:
+        batch = {
+            "id": f"batch_{uuid.uuid4().hex}",
+            "object": "batch",
+            "endpoint": request["endpoint"],
+            "input_file_id": request["input_file_id"],
+            "completion_window": request.get("completion_window", "24h"),
+            "status": "in_progress",
+            "created_at": int(time.time()),
+            "output_file_id": None,
+            "error_file_id": None,
+            "metadata": request.get("metadata"),
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+        }
+        with self._lock:
+            self.batches[batch["id"]] = batch
+            created = dict(batch)
+        threading.Thread(target=self._run_batch, args=(batch["id"],), daemon=True).start()
+        return created
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send_json(self, status: int, data):
+                body = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self) -> bytes:
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def do_POST(self):
+                path = self.path.split("?")[0]
+                if path == "/v1/chat/completions":
+                    self._send_json(200, server._completion(json.loads(self._body())))
+                elif path == "/v1/files":
+                    # multipart upload, parsed with the email parser
+                    raw = b"Content-Type: " + self.headers["Content-Type"].encode() + b"\r\n\r\n" + self._body()
+                    message = BytesParser(policy=HTTP).parsebytes(raw)
+                    parts = {part.get_param("name", header="content-disposition"): part
+                             for part in message.iter_parts()}
+                    upload = parts["file"]
+                    self._send_json(200, server._add_file(
+                        upload.get_filename() or "upload.jsonl",
+                        upload.get_payload(decode=True),
+                        parts["purpose"].get_content().strip() if "purpose" in parts else "batch",
+                    ))
+                elif path == "/v1/batches":
+                    self._send_json(200, server._create_batch(json.loads(self._body())))
+                else:
+                    self._send_json(404, {"error": {"message": "not found"}})
+
+            def do_GET(self):
+                parts = self.path.split("?")[0].strip("/").split("/")
+                if len(parts) == 3 and parts[1] == "batches" and parts[2] in server.batches:
+                    self._send_json(200, server.batches[parts[2]])
+                elif len(parts) == 4 and parts[1] == "files" and parts[3] == "content" and parts[2] in server.files:
+                    content = server.files[parts[2]]["content"]
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/octet-stream")
+                    self.send_header("Content-Length", str(len(content)))
+                    self.end_headers()
+                    self.wfile.write(content)
+                else:
+                    self._send_json(404, {"error": {"message": "not found"}})
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -1,24 +1,117 @@
 from fpdf import FPDF
+from functools import lru_cache
+from PIL import Image
+import io
 import os
+import pandas as pd
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
 from src.MorningUpdate.ReadPdf import GasOilExtractor
+from src.OpenAi import get_setting
+from src.models import Trade, Offers_Bids, Windows, OverView
 
 
+LOGO_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "Logo", "Logo_starfeuls.png")
+LOGO_WIDTH_MM = 30
+# resolution the logo is downscaled to in compact mode
+LOGO_DPI = 150
+
+# regular, bold and italic variant of the embedded unicode font, packages.txt installs it on deploys
+FONT_DIRS = ["/usr/share/fonts/truetype/dejavu", "/usr/share/fonts/dejavu", "/Library/Fonts", "C:/Windows/Fonts"]
+FONT_FILES = {"": "DejaVuSans.ttf", "B": "DejaVuSans-Bold.ttf", "I": "DejaVuSans-Oblique.ttf"}
+
+
+@lru_cache(maxsize=1)
+def compact_logo() -> Optional[bytes]:
+    """The logo downscaled to LOGO_DPI at its printed width, computed once per process."""
+    if not os.path.exists(LOGO_PATH):
+        return None
+    with Image.open(LOGO_PATH) as image:
+        width_px = round(LOGO_WIDTH_MM / 25.4 * LOGO_DPI)
+        if image.width > width_px:
+            image = image.resize((width_px, round(image.height * width_px / image.width)), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=1)
+def find_unicode_font() -> Optional[dict]:
+    """Paths of the unicode font per available style, from REPORT_FONT_DIR or the usual system folders."""
+    font_dir = get_setting("REPORT_FONT_DIR")
+    for directory in ([font_dir] if font_dir else FONT_DIRS):
+        paths = {style: os.path.join(directory, name) for style, name in FONT_FILES.items()}
+        paths = {style: path for style, path in paths.items() if os.path.exists(path)}
+        # bold and italic are optional, missing styles are written in regular
+        if "" in paths:
+            return paths
+    print("No DejaVuSans font found (install fonts-dejavu-core or set REPORT_FONT_DIR), "
+          "reports use Helvetica without € signs")
+    return None
+
 
 # === PDF Builder ===
 class TradeReportPDF(FPDF):
+    """Barging report.
+
+    In compact mode (default, PDF_COMPACT=0 turns it off) the logo is
+    downscaled to LOGO_DPI and text uses an embedded, subsetted unicode font
+    so € signs render. Without a unicode font it falls back to Helvetica.
+    """
+
+    report_title: str = "Barge market update"
+    report_date: str = ""
+    # off when the page numbers are stamped later (see ReportBundle)
+    page_numbers: bool = True
+
+    def __init__(self, *args, compact: Optional[bool] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.compact = compact if compact is not None else get_setting("PDF_COMPACT", "1") == "1"
+        self.font_name = "Helvetica"
+        self.unicode_font = False
+        self._font_styles = set()
+        if self.compact:
+            fonts = find_unicode_font()
+            if fonts:
+                for style, path in fonts.items():
+                    # fpdf2 only embeds the glyphs that are used
+                    self.add_font("ReportSans", style, path)
+                self.font_name = "ReportSans"
+                self.unicode_font = True
+                self._font_styles = set(fonts)
+
+    def set_font(self, family=None, style="", size=0):
+        if self.unicode_font and family == self.font_name and style not in self._font_styles:
+            style = ""
+        super().set_font(family, style, size)
+
+    def _text(self, text) -> str:
+        """Text as the current font can show it."""
+        text = str(text)
+        if self.unicode_font:
+            return text
+        # Encode text to handle Unicode characters
+        return text.encode('latin-1', 'replace').decode('latin-1')
+
+    def _currency(self, text) -> str:
+        text = self._text(text)
+        return text.replace("EUR", "€") if self.unicode_font else text
+
     def header(self):
-        logo_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "Logo", "Logo_starfeuls.png")
-        if os.path.exists(logo_path):
-            self.image(logo_path, x=160, y=10, w=30)
-        self.set_font("Helvetica", "B", 16)
+        logo = compact_logo() if self.compact else (LOGO_PATH if os.path.exists(LOGO_PATH) else None)
+        if logo:
+            # the same bytes give the same image object, so it is embedded only once
+            self.image(io.BytesIO(logo) if isinstance(logo, bytes) else logo, x=160, y=10, w=LOGO_WIDTH_MM)
+        self.set_font(self.font_name, "B", 16)
         self.cell(0, 10, "Starfuels Report", ln=True, align="C")
-        self.set_font("Helvetica", "", 12)
-        self.cell(0, 8, f"Barge market update {self.report_date}", ln=True, align="C")
+        self.set_font(self.font_name, "", 12)
+        self.cell(0, 8, f"{self.report_title} {self.report_date}", ln=True, align="C")
         self.ln(5)
 
     def footer(self):
+        if not self.page_numbers:
+            return
         self.set_y(-15)
-        self.set_font("Helvetica", "I", 8)
+        self.set_font(self.font_name, "I", 8)
         self.cell(0, 10, f"Page {self.page_no()}", align="C")
 
     def add_ara_section(self, araData :GasOilExtractor):
@@ -27,30 +120,29 @@ class TradeReportPDF(FPDF):
         # only add the columns location and price range
         df = df[['location', 'price range']]
         
-        self.set_font("Helvetica", "B", 14)
+        self.set_font(self.font_name, "B", 14)
         self.cell(0, 8, "ARA Barge Freight Market - Gasoil Routes", ln=True)
-        self.set_font("Helvetica", "", 12)
+        self.set_font(self.font_name, "", 12)
         self.ln(2)
         self.set_fill_color(34, 139, 34)
         self.set_text_color(255, 255, 255)
-        self.set_font("Helvetica", "B", 11)
+        self.set_font(self.font_name, "B", 11)
         self.cell(100, 8, "Location", 1, 0, "C", True)
-        self.cell(90, 8, "Rate [EUR/ton]", 1, 0, "C", True)
+        self.cell(90, 8, self._currency("Rate [EUR/ton]"), 1, 0, "C", True)
         self.ln()
         self.set_fill_color(255, 255, 255)
         self.set_text_color(0, 0, 0)
-        self.set_font("Helvetica", "", 11)
+        self.set_font(self.font_name, "", 11)
         for _, row in df.iterrows():
-            self.cell(100, 6, row['location'], 1, 0, "C")
-            self.cell(90, 6, row['price range'], 1, 0, "C")
+            self.cell(100, 6, self._text(row['location']), 1, 0, "C")
+            self.cell(90, 6, self._currency(row['price range']), 1, 0, "C")
             self.ln()
         
         self.ln(5)
-        self.set_font("Helvetica", "B", 12)
+        self.set_font(self.font_name, "B", 12)
         self.cell(0, 12, "Summary:", ln=True)
-        self.set_font("Helvetica", "", 12)
-        # Encode text to handle Unicode characters
-        summary_text = araData.summary_text.encode('latin-1', 'replace').decode('latin-1')
+        self.set_font(self.font_name, "", 12)
+        summary_text = self._text(araData.summary_text)
         self.multi_cell(0, 6, summary_text)
         
     def add_rhine_section(self, rhineData :GasOilExtractor):
@@ -59,51 +151,202 @@ class TradeReportPDF(FPDF):
         # only add the columns location and price range
         df = df[['location', 'price range']]
         
-        self.set_font("Helvetica", "B", 14)
+        self.set_font(self.font_name, "B", 14)
         self.cell(0, 8, "Rhine Barge Freight Market - Gasoil Destinations", ln=True)
-        self.set_font("Helvetica", "", 12)
+        self.set_font(self.font_name, "", 12)
         self.ln(2)
         self.set_fill_color(34, 139, 34)
         self.set_text_color(255, 255, 255)
-        self.set_font("Helvetica", "B", 11)
+        self.set_font(self.font_name, "B", 11)
         self.cell(100, 8, "Location", 1, 0, "C", True)
-        self.cell(90, 8, "Rate [EUR/ton]", 1, 0, "C", True)
+        self.cell(90, 8, self._currency("Rate [EUR/ton]"), 1, 0, "C", True)
         self.ln()
         self.set_fill_color(255, 255, 255)
         self.set_text_color(0, 0, 0)
-        self.set_font("Helvetica", "", 11)
+        self.set_font(self.font_name, "", 11)
         for _, row in df.iterrows():
-            self.cell(100, 6, row['location'], 1, 0, "C")
-            self.cell(90, 6, row['price range'], 1, 0, "C")
+            self.cell(100, 6, self._text(row['location']), 1, 0, "C")
+            self.cell(90, 6, self._currency(row['price range']), 1, 0, "C")
             self.ln()
     
         self.ln(5)
-        self.set_font("Helvetica", "B", 12)
+        self.set_font(self.font_name, "B", 12)
         self.cell(0, 12, "Summary:", ln=True)
-        self.set_font("Helvetica", "", 12)
-        # Encode text to handle Unicode characters
-        summary_text = rhineData.summary_text.encode('latin-1', 'replace').decode('latin-1')
+        self.set_font(self.font_name, "", 12)
+        summary_text = self._text(rhineData.summary_text)
         self.multi_cell(0, 6, summary_text)
 
     def add_rhine_water_levels(self, df):
-        self.set_font("Helvetica", "B", 14)
+        self.set_font(self.font_name, "B", 14)
         self.cell(0, 8, "Rhine Water Levels", ln=True)
-        self.set_font("Helvetica", "", 12)
+        self.set_font(self.font_name, "", 12)
         self.ln(2)
         self.set_fill_color(34, 139, 34)
         self.set_text_color(255, 255, 255)
-        self.set_font("Helvetica", "B", 11)
+        self.set_font(self.font_name, "B", 11)
         self.cell(60, 8, "Location", 1, 0, "C", True)
         self.cell(60, 8, "Current Level [cm]", 1, 0, "C", True)
-        self.cell(60, 8, "Change [cm]", 1, 0, "C", True)
+        self.cell(60, 8, "Forecast [cm]", 1, 0, "C", True)
         self.ln()
         self.set_fill_color(255, 255, 255)
         self.set_text_color(0, 0, 0)
-        self.set_font("Helvetica", "", 11)
+        self.set_font(self.font_name, "", 11)
         for _, row in df.iterrows():
-            self.cell(60, 6, row['Station'], 1, 0, "C")
+            self.cell(60, 6, self._text(row['Station']), 1, 0, "C")
             self.cell(60, 6, str(row['Current (cm)']), 1, 0, "C")
             self.cell(60, 6, str(row['4 day - Forecast (cm)']), 1, 0, "C")
             self.ln()
         self.ln(5)
 
+
+BARGING_SECTIONS = ("ara", "rhine", "water_levels")
+
+
+def build_barging_report(extractorAra: Optional[GasOilExtractor],
+                         extractorRhine: Optional[GasOilExtractor],
+                         water_levels: Optional[pd.DataFrame],
+                         report_date: str,
+                         sections: Sequence[str] = BARGING_SECTIONS,
+                         page_numbers: bool = True) -> TradeReportPDF:
+    """Build the barging report, one page per section: ARA, Rhine and the water levels.
+
+    `pdf.section_pages` holds the 0-based page range of every section, a long
+    summary can push a section onto more than one page.
+    """
+    pdf = TradeReportPDF(orientation="P", unit="mm", format="A4")
+    pdf.report_date = report_date
+    pdf.page_numbers = page_numbers
+    pdf.section_pages = {}
+
+    for section in sections:
+        first_page = pdf.page_no()
+        pdf.add_page()
+        if section == "ara" and extractorAra:
+            pdf.add_ara_section(extractorAra)
+        elif section == "rhine" and extractorRhine:
+            pdf.add_rhine_section(extractorRhine)
+        elif section == "water_levels":
+            pdf.add_rhine_water_levels(water_levels if water_levels is not None else pd.DataFrame())
+        pdf.section_pages[section] = range(first_page, pdf.page_no())
+    return pdf
+
+
+# === MOC trade report ===
+
+# (header, width in mm) of the tables, widths add up to the 190 mm between the margins
+WINDOW_COLUMNS = [("Window", 40), ("Dates", 150)]
+OVERVIEW_COLUMNS = [("Date", 25), ("Product", 45), ("Day avg", 24), ("Week avg", 24),
+                    ("Volume", 24), ("Week vol", 24), ("Cum vol", 24)]
+TRADE_COLUMNS = [("Date", 22), ("Product", 34), ("Type", 20), ("Seller", 32), ("Buyer", 32),
+                 ("kt", 14), ("Price", 18), ("Window", 18)]
+OFFER_BID_COLUMNS = [("Date", 25), ("Product", 55), ("Type", 25), ("Participant", 85)]
+
+
+def _fmt(value, decimals: int = 2) -> str:
+    if value is None:
+        return "-"
+    # the LLM gives whole numbers as ints (2 for "2kt"), format them like floats
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f"{value:.{decimals}f}"
+    return str(value)
+
+
+def window_row(window: Windows) -> Sequence[str]:
+    return (_fmt(window.type), _fmt(window.Dates))
+
+
+def overview_row(overview: OverView) -> Sequence[str]:
+    return (_fmt(overview.date), _fmt(overview.product), _fmt(overview.day_avg_price),
+            _fmt(overview.week_avg_price), _fmt(overview.total_volume, 1), _fmt(overview.week_volume, 1),
+            _fmt(overview.cum_volume, 1))
+
+
+def trade_row(trade: Trade) -> Sequence[str]:
+    return (_fmt(trade.date), _fmt(trade.product), _fmt(trade.type), _fmt(trade.seller), _fmt(trade.buyer),
+            _fmt(trade.volume_kt, 1), _fmt(trade.price), _fmt(trade.window))
+
+
+def offer_bid_row(offer_bid: Offers_Bids) -> Sequence[str]:
+    return (_fmt(offer_bid.date), _fmt(offer_bid.product), _fmt(offer_bid.type), _fmt(offer_bid.participant))
+
+
+class MocReportPDF(TradeReportPDF):
+    """MOC trade report, the tables are written row by row from iterables.
+
+    Rows are never collected in a list or DataFrame, and the column header
+    is repeated at the top of every page a table runs onto. Memory is not
+    constant though: FPDF keeps the content of every page until output(), so
+    it grows with the number of pages (roughly 12 MB for 20k trades).
+    """
+
+    report_title: str = "MOC report"
+
+    def _fit(self, text: str, width: float) -> str:
+        """Cut text that does not fit in a cell of `width` mm."""
+        text = self._text(text)
+        if self.get_string_width(text) <= width - 2:
+            return text
+        while text and self.get_string_width(text + "...") > width - 2:
+            text = text[:-1]
+        return text + "..."
+
+    def _table_header(self, columns: List[Tuple[str, float]]):
+        self.set_fill_color(34, 139, 34)
+        self.set_text_color(255, 255, 255)
+        self.set_font(self.font_name, "B", 9)
+        for name, width in columns:
+            self.cell(width, 7, name, 1, 0, "C", True)
+        self.ln()
+        self.set_fill_color(255, 255, 255)
+        self.set_text_color(0, 0, 0)
+        self.set_font(self.font_name, "", 8)
+
+    def stream_table(self, title: str, columns: List[Tuple[str, float]], rows: Iterable[Sequence[str]],
+                     row_height: float = 6) -> int:
+        """Write a titled table from an iterable of rows, returns the number of rows written."""
+        self.set_font(self.font_name, "B", 14)
+        self.cell(0, 8, title, ln=True)
+        self.ln(2)
+        self._table_header(columns)
+
+        count = 0
+        for row in rows:
+            if self.will_page_break(row_height):
+                self.add_page()
+                self._table_header(columns)
+            for value, (_, width) in zip(row, columns):
+                self.cell(width, row_height, self._fit(value, width), 1, 0, "C")
+            self.ln()
+            count += 1
+
+        if count == 0:
+            self.set_font(self.font_name, "I", 9)
+            self.cell(0, row_height, "No data", ln=True)
+        self.ln(5)
+        return count
+
+
+def create_trade_report_pdf(file_path, trades: Iterable[Trade], offers_bids: Iterable[Offers_Bids],
+                            windows: Iterable[Windows], overviews: Iterable[OverView], date: str) -> dict:
+    """Write the MOC trade report to `file_path`.
+
+    All inputs may be generators, each one is consumed once while its table
+    is written. The rendered pages stay in memory until the file is written,
+    see MocReportPDF. Returns the number of rows written per table.
+    """
+    pdf = MocReportPDF(orientation="P", unit="mm", format="A4")
+    pdf.report_date = date
+    pdf.add_page()
+
+    sections: List[Tuple[str, str, list, Iterable, Callable]] = [
+        ("windows", "Windows", WINDOW_COLUMNS, windows, window_row),
+        ("overviews", "Overview", OVERVIEW_COLUMNS, overviews, overview_row),
+        ("trades", "Trades", TRADE_COLUMNS, trades, trade_row),
+        ("offers_bids", "Offers / Bids", OFFER_BID_COLUMNS, offers_bids, offer_bid_row),
+    ]
+    counts = {}
+    for key, title, columns, items, to_row in sections:
+        counts[key] = pdf.stream_table(title, columns, (to_row(item) for item in items))
+
+    pdf.output(str(file_path))
+    return counts
@@ -0,0 +1,95 @@
+import io
+import re
+import zipfile
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+from PyPDF2 import PageObject, PdfReader, PdfWriter
+
+from src.MorningUpdate.ReadPdf import GasOilExtractor
+from src.PdfCreation import TradeReportPDF, build_barging_report
+
+
+@dataclass(frozen=True)
+class RecipientProfile:
+    """A report variant: who gets it and which sections of the barging report it contains."""
+    name: str
+    sections: Tuple[str, ...]
+
+
+DEFAULT_PROFILES = [
+    RecipientProfile("ARA", ("ara",)),
+    RecipientProfile("Rhine", ("rhine",)),
+    RecipientProfile("Full", ("ara", "rhine", "water_levels")),
+]
+
+
+class _PageNumberPDF(TradeReportPDF):
+    """Pages with only the footer of TradeReportPDF, in the same font."""
+
+    def header(self):
+        pass
+
+
+def page_number_overlay(page_count: int) -> bytes:
+    """Pages with only the footer page number, stamped on the assembled reports."""
+    pdf = _PageNumberPDF(orientation="P", unit="mm", format="A4")
+    pdf.set_auto_page_break(False)
+    for _ in range(page_count):
+        pdf.add_page()
+    return bytes(pdf.output())
+
+
+def render_report_bundle(profiles: Sequence[RecipientProfile],
+                         extractorAra: Optional[GasOilExtractor],
+                         extractorRhine: Optional[GasOilExtractor],
+                         water_levels: Optional[pd.DataFrame],
+                         report_date: str) -> Dict[str, bytes]:
+    """Render the barging report for every recipient profile, returns pdf bytes per profile name.
+
+    Every section used by any profile is rendered once, in a single pdf. The
+    profiles are put together from its pages and get their page numbers
+    stamped afterwards, so N variants cost about one render.
+    """
+    sections = list(dict.fromkeys(section for profile in profiles for section in profile.sections))
+    rendered = build_barging_report(extractorAra, extractorRhine, water_levels, report_date,
+                                    sections=sections, page_numbers=False)
+    reader = PdfReader(io.BytesIO(bytes(rendered.output())))
+
+    variants: Dict[Tuple[str, ...], List[int]] = {
+        tuple(profile.sections): [page for section in profile.sections for page in rendered.section_pages[section]]
+        for profile in profiles
+    }
+    numbers = PdfReader(io.BytesIO(page_number_overlay(max((len(p) for p in variants.values()), default=0))))
+
+    pdfs: Dict[Tuple[str, ...], bytes] = {}
+    for variant, pages in variants.items():
+        writer = PdfWriter()
+        for number, page in enumerate(pages):
+            # merged onto a fresh page: the rendered page is shared by the variants, and PyPDF2
+            # only writes the merged content stream as a proper object for a page added after merging
+            source = reader.pages[page]
+            stamped = PageObject.create_blank_page(width=source.mediabox.width, height=source.mediabox.height)
+            stamped.merge_page(source)
+            stamped.merge_page(numbers.pages[number])
+            stamped.compress_content_streams()
+            writer.add_page(stamped)
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        pdfs[variant] = buffer.getvalue()
+
+    return {profile.name: pdfs[tuple(profile.sections)] for profile in profiles}
+
+
+def bundle_filename(profile_name: str, report_date: str) -> str:
+    safe_name = re.sub(r"[^A-Za-z0-9]+", "_", profile_name).strip("_").lower()
+    return f"barging_report_{safe_name}_{report_date}.pdf"
+
+
+def zip_bundle(pdfs: Dict[str, bytes], report_date: str) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        for name, pdf_bytes in pdfs.items():
+            zip_file.writestr(bundle_filename(name, report_date), pdf_bytes)
+    return buffer.getvalue()
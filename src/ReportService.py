@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Headless access to the report pipeline, without the Streamlit app.
+
+Run as HTTP service:
+    python -m src.ReportService serve --port 8080
+
+Or as one-off CLI commands:
+    python -m src.ReportService analyse ara.pdf
+    python -m src.ReportService moc sample_report.txt
+    python -m src.ReportService barging ara.pdf rhine.pdf -o barging_report.pdf
+    python -m src.ReportService export trades --format parquet -o trades.parquet --from 01-01-2025
+
+HTTP endpoints (add ?async=1 to get a job id back instead of waiting):
+    GET  /health
+    POST /analyse           body: pdf bytes                 -> JSON
+    POST /moc               body: MOC report text           -> JSON
+    POST /barging-report    body: JSON {"pdfs": [base64, ...],
+                                        "water_levels": [{...}, ...],
+                                        "date": "dd-mm-yyyy"}   -> PDF
+    GET  /jobs/<id>         job status
+    GET  /jobs/<id>/result  job result (same response as the synchronous call)
+
+Export endpoints stream a single table as ?format=csv|xlsx|parquet:
+    POST /export/analyse?table=<layout name>    body: pdf bytes, default the report's own table
+    POST /export/moc?table=trades|offers_bids|overviews|windows|raw_trades|counterparties|counterparty_activity
+                                                body: MOC report text
+    GET  /export/results?table=trades&from=dd-mm-yyyy&to=dd-mm-yyyy
+                                                all MOC results of the inbox daemon
+"""
+
+import argparse
+import base64
+import contextlib
+import io
+import json
+import sys
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterator, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import PyPDF2
+
+from src.Counterparties import counterparty_activity, counterparty_volumes, get_default_index
+from src.Export import EXPORT_FORMATS, RESULTS_DIR, export_to, iter_result_records, stream_export, table_types
+from src.ReportParser import ParsedReport
+from src.OpenAi import extract_trades_from_rawtext
+from src.MorningUpdate.ReadPdf import GasOilExtractor
+from src.MorningUpdate.WaterLevels import PegelOnlineProvider, get_water_levels
+from src.PdfCreation import build_barging_report
+
+
+# (content type, body) as returned by every endpoint
+Response = Tuple[str, bytes]
+
+# LLM calls and pdf analysis inside a job run on their own wider pool
+_io_executor = ThreadPoolExecutor(max_workers=8)
+
+
+def _df_records(df: pd.DataFrame) -> list:
+    # through to_json so NaN ends up as null
+    return json.loads(df.to_json(orient="records"))
+
+
+def _json_response(data) -> Response:
+    return "application/json", json.dumps(data).encode("utf-8")
+
+
+def read_pdf_body(data: bytes) -> io.BytesIO:
+    """Uploaded pdf bytes as a file object, a ValueError when they aren't a readable pdf."""
+    source = io.BytesIO(data)
+    try:
+        if not PyPDF2.PdfReader(source).pages:
+            raise ValueError("the pdf has no pages")
+    except (PyPDF2.errors.PyPdfError, ValueError, KeyError) as e:
+        raise ValueError(f"Invalid PDF: {e}") from e
+    source.seek(0)
+    return source
+
+
+def analyse_pdf(source, summary: bool = True) -> GasOilExtractor:
+    """Run the same steps as 'Analyse Files' on one pdf (path or file object)."""
+    extractor = GasOilExtractor(source)
+    extractor.set_data_text()
+    extractor.set_df()
+    extractor.set_price_ranges()
+    if summary:
+        extractor.set_summary_text()
+    return extractor
+
+
+def extractor_to_dict(extractor: GasOilExtractor) -> dict:
+    return {
+        "type_report": extractor.type_report,
+        "table": _df_records(extractor.df),
+        "tables": {name: _df_records(df) for name, df in extractor.tables.items()},
+        "summary": extractor.summary_text,
+    }
+
+
+def read_moc_report(text: str) -> ParsedReport:
+    """ParsedReport of a MOC text report, a ValueError when the text isn't a MOC report."""
+    try:
+        return ParsedReport(text)
+    except (IndexError, ValueError) as e:
+        raise ValueError(f"Malformed MOC report: {e}") from e
+
+
+def parse_moc_report(report: Union[str, ParsedReport], extract_trades: bool = True) -> dict:
+    """Parse a MOC text report and let the LLM structure the trades, one call per block in parallel.
+
+    The trades and offers/bids are also rolled up per canonical counterparty
+    of the alias file, names that aren't in it are left out of those tables.
+    """
+    parsed_report = read_moc_report(report) if isinstance(report, str) else report
+    trades = []
+    if extract_trades:
+        futures = [_io_executor.submit(extract_trades_from_rawtext, raw_trade, parsed_report.date)
+                   for raw_trade in parsed_report.get_trades()]
+        for future in futures:
+            trades.extend(future.result())
+
+    return {
+        "date": parsed_report.date,
+        "windows": [asdict(w) for w in parsed_report.get_window_data()],
+        "offers_bids": [asdict(ob) for ob in parsed_report.get_offers_bids()],
+        "raw_trades": [asdict(t) for t in parsed_report.get_trades()],
+        "trades": [asdict(t) for t in trades],
+        "overviews": [asdict(o) for o in parsed_report.get_overviews()],
+        "counterparties": _df_records(counterparty_volumes(trades, get_default_index())),
+        "counterparty_activity": _df_records(counterparty_activity(parsed_report.get_offers_bids(),
+                                                                   get_default_index())),
+    }
+
+
+def create_barging_report(pdf_sources: List, water_levels: Optional[pd.DataFrame] = None,
+                          report_date: Optional[str] = None) -> bytes:
+    """Analyse the ARA and Rhine pdfs and return the barging report as pdf bytes."""
+    extractors = list(_io_executor.map(analyse_pdf, pdf_sources))
+    extractorAra = next((e for e in extractors if e.type_report == "ARA"), None)
+    extractorRhine = next((e for e in extractors if e.type_report == "Rhine"), None)
+
+    if water_levels is None:
+        water_levels = get_water_levels(PegelOnlineProvider())
+    report_date = report_date or datetime.now().strftime("%d-%m-%Y")
+
+    pdf = build_barging_report(extractorAra, extractorRhine, water_levels, report_date)
+    return bytes(pdf.output())
+
+
+class JobManager:
+    """Runs pipeline calls on a worker pool and keeps the last results around."""
+
+    def __init__(self, max_workers: int = 4, max_jobs: int = 200):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._jobs: "OrderedDict[str, Future]" = OrderedDict()
+        self._max_jobs = max_jobs
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[[], Response]) -> str:
+        job_id = uuid.uuid4().hex
+        future = self._executor.submit(fn)
+        with self._lock:
+            self._jobs[job_id] = future
+            # forget the oldest finished jobs
+            while len(self._jobs) > self._max_jobs:
+                oldest_id, oldest = next(iter(self._jobs.items()))
+                if not oldest.done():
+                    break
+                del self._jobs[oldest_id]
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Future]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id: str) -> Optional[dict]:
+        future = self.get(job_id)
+        if future is None:
+            return None
+        if not future.done():
+            return {"id": job_id, "status": "running" if future.running() else "queued"}
+        error = future.exception()
+        if error is not None:
+            return {"id": job_id, "status": "failed", "error": str(error)}
+        return {"id": job_id, "status": "done"}
+
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+    jobs: JobManager = None
+    results_dir: str = RESULTS_DIR
+
+    def _send(self, status: int, content_type: str, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, data):
+        self._send(status, *_json_response(data))
+
+    def _send_export(self, fmt: str, filename: str, chunks: Iterator[bytes]):
+        """Stream an export. There is no Content-Length, the response ends when the connection closes."""
+        try:
+            # the first chunk is made before the headers go out, so early errors still get a proper status
+            first = next(chunks, b"")
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+        extension, content_type = EXPORT_FORMATS[fmt]
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Disposition", f'attachment; filename="{filename}.{extension}"')
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        self.wfile.write(first)
+        for chunk in chunks:
+            self.wfile.write(chunk)
+
+    def _export_params(self, query: dict, default_table: Optional[str]) -> Optional[Tuple[str, Optional[str]]]:
+        fmt = query.get("format", ["csv"])[0]
+        if fmt not in EXPORT_FORMATS:
+            self._send_json(400, {"error": f"Unknown format {fmt}, use one of {', '.join(EXPORT_FORMATS)}"})
+            return None
+        return fmt, query.get("table", [default_table])[0]
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length)
+
+    def _run(self, fn: Callable[[], Response], query: dict):
+        job_id = self.jobs.submit(fn)
+        if query.get("async", ["0"])[0] == "1":
+            self._send_json(202, {"id": job_id, "status_url": f"/jobs/{job_id}"})
+            return
+        self._send_job_result(job_id)
+
+    def _send_job_result(self, job_id: str):
+        future = self.jobs.get(job_id)
+        try:
+            content_type, body = future.result()
+        except Exception as e:
+            self._send_json(500, {"id": job_id, "error": str(e)})
+            return
+        self._send(200, content_type, body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        parts = url.path.strip("/").split("/")
+
+        if url.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif len(parts) == 2 and parts[0] == "jobs":
+            status = self.jobs.status(parts[1])
+            if status is None:
+                self._send_json(404, {"error": "unknown job"})
+            else:
+                self._send_json(200, status)
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "result":
+            status = self.jobs.status(parts[1])
+            if status is None:
+                self._send_json(404, {"error": "unknown job"})
+            elif status["status"] in ("queued", "running"):
+                self._send_json(409, status)
+            else:
+                self._send_job_result(parts[1])
+        elif url.path == "/export/results":
+            params = self._export_params(query, "trades")
+            if params is None:
+                return
+            fmt, table = params
+            records = iter_result_records(table, self.results_dir,
+                                          query.get("from", [None])[0], query.get("to", [None])[0])
+            self._send_export(fmt, table, stream_export(records, fmt, types=table_types(table)))
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        body = self._read_body()
+
+        if url.path == "/analyse":
+            summary = query.get("summary", ["1"])[0] == "1"
+            try:
+                pdf = read_pdf_body(body)
+            except ValueError as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            self._run(lambda: _json_response(extractor_to_dict(analyse_pdf(pdf, summary))), query)
+
+        elif url.path == "/moc":
+            extract_trades = query.get("trades", ["1"])[0] == "1"
+            try:
+                parsed_report = read_moc_report(body.decode("utf-8"))
+            except ValueError as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            self._run(lambda: _json_response(parse_moc_report(parsed_report, extract_trades)), query)
+
+        elif url.path == "/barging-report":
+            try:
+                request = json.loads(body)
+                pdfs = [read_pdf_body(base64.b64decode(p)) for p in request["pdfs"]]
+            except (ValueError, KeyError, TypeError) as e:
+                self._send_json(400, {"error": f"Invalid request: {e}"})
+                return
+            water_levels = pd.DataFrame(request["water_levels"]) if request.get("water_levels") else None
+            report_date = request.get("date")
+            self._run(lambda: ("application/pdf", create_barging_report(pdfs, water_levels, report_date)), query)
+
+        elif url.path in ("/export/analyse", "/export/moc"):
+            analyse = url.path == "/export/analyse"
+            params = self._export_params(query, None if analyse else "trades")
+            if params is None:
+                return
+            fmt, table = params
+            try:
+                if analyse:
+                    pdf = read_pdf_body(body)
+                else:
+                    parsed_report = read_moc_report(body.decode("utf-8"))
+            except ValueError as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            try:
+                if analyse:
+                    extractor = analyse_pdf(pdf, summary=False)
+                    tables = extractor.tables
+                    table = table or extractor.type_report
+                else:
+                    extract_trades = (table in ("trades", "counterparties")
+                                      and query.get("trades", ["1"])[0] == "1")
+                    tables = parse_moc_report(parsed_report, extract_trades)
+            except Exception as e:
+                self._send_json(500, {"error": str(e)})
+                return
+            if table not in tables or table == "date":
+                self._send_json(404, {"error": f"Unknown table {table}"})
+                return
+            self._send_export(fmt, table, stream_export(tables[table], fmt, types=table_types(table)))
+
+        else:
+            self._send_json(404, {"error": "not found"})
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8080, workers: int = 4,
+                results_dir: str = RESULTS_DIR) -> ThreadingHTTPServer:
+    """The HTTP server with its own job pool, port 0 picks a free port."""
+    handler = type("ServiceHandler", (_ServiceHandler,), {"jobs": JobManager(max_workers=workers),
+                                                          "results_dir": results_dir})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve(host: str = "127.0.0.1", port: int = 8080, workers: int = 4, results_dir: str = RESULTS_DIR):
+    server = make_server(host, port, workers, results_dir)
+    print(f"Report service listening on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless MOC / barging report pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="run the HTTP service")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8080)
+    serve_parser.add_argument("--workers", type=int, default=4)
+    serve_parser.add_argument("--results", default=RESULTS_DIR, help="inbox daemon results for /export/results")
+
+    analyse_parser = commands.add_parser("analyse", help="analyse a barge freight pdf, prints JSON")
+    analyse_parser.add_argument("pdf")
+    analyse_parser.add_argument("--no-summary", action="store_true")
+
+    moc_parser = commands.add_parser("moc", help="parse a MOC text report, prints JSON")
+    moc_parser.add_argument("report")
+    moc_parser.add_argument("--no-trades", action="store_true")
+
+    barging_parser = commands.add_parser("barging", help="create the barging pdf report")
+    barging_parser.add_argument("pdfs", nargs="+")
+    barging_parser.add_argument("-o", "--output", required=True)
+    barging_parser.add_argument("--date", default=None)
+
+    export_parser = commands.add_parser("export", help="export a table of the inbox daemon MOC results")
+    export_parser.add_argument("table", choices=["trades", "offers_bids", "overviews", "windows", "raw_trades",
+                                                 "counterparties", "counterparty_activity"])
+    export_parser.add_argument("-o", "--output", required=True)
+    export_parser.add_argument("--format", choices=list(EXPORT_FORMATS), default=None,
+                               help="defaults to the extension of the output file")
+    export_parser.add_argument("--results", default=RESULTS_DIR)
+    export_parser.add_argument("--from", dest="date_from", default=None, help="first report date, dd-mm-yyyy")
+    export_parser.add_argument("--to", dest="date_to", default=None, help="last report date, dd-mm-yyyy")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        serve(args.host, args.port, args.workers, args.results)
+    elif args.command in ("analyse", "moc"):
+        # stdout carries only the JSON, progress messages of the pipeline go to stderr
+        with contextlib.redirect_stdout(sys.stderr):
+            if args.command == "analyse":
+                result = extractor_to_dict(analyse_pdf(args.pdf, summary=not args.no_summary))
+            else:
+                with open(args.report, "r", encoding="utf-8") as f:
+                    result = parse_moc_report(f.read(), extract_trades=not args.no_trades)
+        json.dump(result, sys.stdout, indent=2)
+    elif args.command == "barging":
+        pdf_bytes = create_barging_report(args.pdfs, report_date=args.date)
+        with open(args.output, "wb") as f:
+            f.write(pdf_bytes)
+        print(f"✅ PDF created: {args.output}")
+    elif args.command == "export":
+        fmt = args.format or args.output.rsplit(".", 1)[-1].lower()
+        if fmt not in EXPORT_FORMATS:
+            parser.error(f"Unknown format {fmt}, use --format")
+        records = iter_result_records(args.table, args.results, args.date_from, args.date_to)
+        with open(args.output, "wb") as f:
+            export_to(records, fmt, f, types=table_types(args.table))
+        print(f"✅ Export created: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ import sys
 import streamlit as st
 from datetime import datetime
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 
 # Add the src directory to the path
 src_path = os.path.join(os.path.dirname(__file__), 'src')
@@ -12,7 +13,11 @@ try:
     from src.ReportParser import ParsedReport
     from src.OpenAi import extract_trades_from_rawtext
     from MorningUpdate.ReadPdf import GasOilExtractor
-    from src.PdfCreation import TradeReportPDF
+    from MorningUpdate.Speculative import SpeculativeAnalyser
+    from MorningUpdate.WaterLevels import PegelOnlineProvider, WaterLevelStore, get_water_levels
+    from src.PdfCreation import build_barging_report
+    from src.ReportBundle import DEFAULT_PROFILES, render_report_bundle, zip_bundle
+    from src.Export import EXPORT_FORMATS, export_bytes
     import time
     import json
 except ImportError as e:
@@ -78,6 +83,39 @@ def show_login_tab():
         current_user = st.session_state.get('username', 'Guest')
         st.metric("Current User", current_user)
 
+@st.cache_resource
+def get_gauge_provider():
+    """Shared gauge provider so its response cache is reused across sessions."""
+    return PegelOnlineProvider(base_url=os.environ.get("GAUGE_API_URL"))
+
+
+@st.cache_resource
+def get_analysis_executor():
+    """Worker pool shared by all sessions for the background pdf analysis."""
+    return ThreadPoolExecutor(max_workers=4)
+
+
+@st.cache_resource
+def get_water_level_store():
+    return WaterLevelStore()
+
+
+def show_data_export(extractor: "GasOilExtractor"):
+    """Download the parsed tables of a report as csv, xlsx or parquet."""
+    tables = extractor.tables
+    col_table, col_format = st.columns(2)
+    table = col_table.selectbox("Table", list(tables), key=f"export_table_{extractor.type_report}")
+    fmt = col_format.selectbox("Format", list(EXPORT_FORMATS), key=f"export_format_{extractor.type_report}")
+    extension, mime = EXPORT_FORMATS[fmt]
+    st.download_button(
+        label=f"📤 Download {table} ({fmt})",
+        data=export_bytes(tables[table], fmt),
+        file_name=f"{extractor.type_report.lower()}_{table}_{datetime.now().strftime('%Y%m%d')}.{extension}",
+        mime=mime,
+        key=f"export_download_{extractor.type_report}",
+    )
+
+
 def show_barging_update():
     """Display the Barging Update tab with information about barging updates."""
     
@@ -92,42 +130,32 @@ def show_barging_update():
     else:
         st.success("✅ Two PDF files uploaded successfully!")
 
+    # start analysing the uploads right away, removed files get their work cancelled
+    if 'speculative_analyser' not in st.session_state:
+        st.session_state['speculative_analyser'] = SpeculativeAnalyser(get_analysis_executor())
+    analyser: SpeculativeAnalyser = st.session_state['speculative_analyser']
+    upload_hashes = analyser.sync([uploaded_file.getvalue() for uploaded_file in uploaded_files])
+
     # Analysis Section
     if st.button("Analyse Files", type="primary", use_container_width=True):
         with st.spinner("Analyzing uploaded files..."):
             # Process both files
             extractor_files = []
             
-            for i, uploaded_file in enumerate(uploaded_files, 1):
-                # Save uploaded file temporarily
-                temp_path = f"temp_{uploaded_file.name}"
-                with open(temp_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
-                
+            for uploaded_file, upload_hash in zip(uploaded_files, upload_hashes):
                 try:
-                    # Initialize the extractor
-                    extractor = GasOilExtractor(temp_path)
-                    extractor.set_data_text()
-                    extractor.set_df()
-                    extractor.set_price_ranges()
-                    extractor.set_summary_text()
-                    
-                    extractor_files.append(extractor)
-                    
-                    # Clean up temp file
-                    if os.path.exists(temp_path):
-                        os.remove(temp_path)
-                        
+                    # usually already done in the background
+                    extractor_files.append(analyser.result(upload_hash))
                 except Exception as e:
                     st.error(f"❌ Error processing {uploaded_file.name}: {str(e)}")
-                    if os.path.exists(temp_path):
-                        os.remove(temp_path)
             
             # Store extractors in session state
             st.session_state['extractor_files'] = extractor_files
     
     
     
+    extractorAra = None
+    extractorRhine = None
     # Display results if extractors exist in session state
     if 'extractor_files' in st.session_state:
         
@@ -148,6 +176,7 @@ def show_barging_update():
                 # ARA DataFrame
                 show_df_ara = extractorAra.df[['location', 'avg price', 'min price', 'max price', 'price range']]
                 st.dataframe(show_df_ara, use_container_width=True)
+                show_data_export(extractorAra)
                 
                 # ARA Summary input
                 st.text_area(
@@ -163,6 +192,7 @@ def show_barging_update():
             with st.expander("🚢 Rhine Data", expanded=True):
                 show_df_rhine = extractorRhine.df[['location', 'avg price', 'min price', 'max price', 'price range']]
                 st.dataframe(show_df_rhine, use_container_width=True)
+                show_data_export(extractorRhine)
 
                 # Rhine Summary input
                 st.text_area(
@@ -178,12 +208,12 @@ def show_barging_update():
                 # Rhine Water Levels Section
                 st.subheader("🌊 Rhine Water Levels")
 
-                # create an df
-                df_rhine_levels = pd.DataFrame({
-                    "Station": ["Ruhrort", "Cologne", "Kaub", "Maxau"],
-                    "Current (cm)": [0, 0, 0, 0],
-                    "4 day - Forecast (cm)": [0, 0, 0, 0]
-                })
+                # fetch the levels once per session, the refresh button fetches them again
+                if st.button("🔄 Refresh water levels") or 'rhine_levels_fetched' not in st.session_state:
+                    with st.spinner("Fetching Rhine water levels..."):
+                        st.session_state['rhine_levels_fetched'] = get_water_levels(
+                            get_gauge_provider(), get_water_level_store())
+                df_rhine_levels = st.session_state['rhine_levels_fetched']
                 
                 # Editable Rhine water levels
                 edited_df = st.data_editor(
@@ -201,34 +231,22 @@ def show_barging_update():
     # Create PDF button
     if st.button(f"Create barging PDF Report"):
         # You can add PDF generation logic here
-            pdf = TradeReportPDF(orientation="P", unit="mm", format="A4")
-            pdf.report_date = datetime.now().strftime("%d-%m-%Y")
-            
-            # add two pages 
-            pdf.add_page()
-            
             # update the summary texts from the text areas
             if extractorAra:
                 extractorAra.summary_text = st.session_state.get('summary_ARA', extractorAra.summary_text)
             if extractorRhine:
                 extractorRhine.summary_text = st.session_state.get('summary_Rhine', extractorRhine.summary_text)
             
-            # add the ara section
-            if extractorAra:
-                pdf.add_ara_section(extractorAra)
-            pdf.add_page()
-            if extractorRhine:
-                pdf.add_rhine_section(extractorRhine)
-                
-            pdf.add_page()
-            pdf.add_rhine_water_levels(st.session_state.get('rhine_water_levels', pd.DataFrame()))
-
-    
-    
+            pdf = build_barging_report(
+                extractorAra,
+                extractorRhine,
+                st.session_state.get('rhine_water_levels', pd.DataFrame()),
+                datetime.now().strftime("%d-%m-%Y"),
+            )
             
             # save the pdf
             filename = f"barging_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-            output_dir = os.path.join(os.path.dirname(__file__), "output")
+            output_dir = os.environ.get("REPORT_OUTPUT_DIR", os.path.join(os.path.dirname(__file__), "output"))
             os.makedirs(output_dir, exist_ok=True)
             output_path = os.path.join(output_dir, filename)
             pdf.output(output_path)
@@ -245,6 +263,39 @@ def show_barging_update():
 
             st.success("✅ PDF created successfully!")
 
+    # Report bundle for the different desks and clients
+    profile_names = st.multiselect(
+        "Recipient variants",
+        [profile.name for profile in DEFAULT_PROFILES],
+        default=[profile.name for profile in DEFAULT_PROFILES],
+    )
+    if st.button("Create report bundle") and profile_names:
+        if not (extractorAra or extractorRhine):
+            st.warning("⚠️ Analyse the files before creating the report bundle.")
+            return
+        if extractorAra:
+            extractorAra.summary_text = st.session_state.get('summary_ARA', extractorAra.summary_text)
+        if extractorRhine:
+            extractorRhine.summary_text = st.session_state.get('summary_Rhine', extractorRhine.summary_text)
+
+        report_date = datetime.now().strftime("%d-%m-%Y")
+        with st.spinner("Rendering report variants..."):
+            pdfs = render_report_bundle(
+                [profile for profile in DEFAULT_PROFILES if profile.name in profile_names],
+                extractorAra,
+                extractorRhine,
+                st.session_state.get('rhine_water_levels', pd.DataFrame()),
+                report_date,
+            )
+
+        st.download_button(
+            label=f"📥 Download {len(pdfs)} reports (zip)",
+            data=zip_bundle(pdfs, report_date),
+            file_name=f"barging_reports_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
+            mime="application/zip",
+            use_container_width=True
+        )
+
 
 def main():
     print("Starting MOC Report Streamlit App...")
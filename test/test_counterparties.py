@@ -0,0 +1,60 @@
+from src.Counterparties import CounterpartyIndex, counterparty_volumes, normalize_name
+from src.models import Trade
+
+
+def make_index():
+    index = CounterpartyIndex()
+    index.add("petroineos", "Petroineos Ltd")
+    index.add("vitol", "Vitol SA")
+    return index
+
+
+def test_normalize_name_drops_legal_form():
+    assert normalize_name("Vitol S.A.") == normalize_name("VITOL sa") == "vitol"
+
+
+def test_fuzzy_matches_do_not_drift():
+    index = make_index()
+    chain = ["Petroineos", "Petroineo", "Petrineos", "Petrinos", "Petrins", "Petrin"]
+    resolved = dict(zip(chain, index.resolve_many(chain)))
+    assert resolved["Petroineo"] == "petroineos"
+    # each spelling is scored against the registered aliases, not against earlier matches
+    assert resolved["Petrin"] is None
+    assert index.resolve("Petrins") is None
+
+
+def test_fuzzy_match_is_not_saved(tmp_path):
+    index = make_index()
+    assert index.resolve("Petroineo") == "petroineos"
+    path = tmp_path / "aliases.json"
+    index.save(str(path))
+    assert CounterpartyIndex.load(str(path))._keys == make_index()._keys
+
+
+def test_unknown_name_is_cached_until_an_alias_is_added():
+    index = make_index()
+    assert index.resolve("Gunvor") is None
+    assert index._cache["Gunvor"] is None
+    index.add("gunvor", "Gunvor Group")
+    assert index.resolve("Gunvor") == "gunvor"
+
+
+def test_volumes_leave_unknown_counterparties_out_by_default():
+    index = make_index()
+    trades = [Trade(date="06-10-2025", product="EBOB", price=1.0, volume_kt=5.0, buyer="Vitol",
+                    seller="Petroineo", window="FE", raw_text="", type="trade"),
+              Trade(date="06-10-2025", product="EBOB", price=1.0, volume_kt=2.0, buyer="Gunvor",
+                    seller="Vitol", window="FE", raw_text="", type="trade")]
+    volumes = counterparty_volumes(trades, index).set_index("counterparty")
+    assert volumes.loc["vitol", ["bought_kt", "sold_kt"]].tolist() == [5.0, 2.0]
+    assert "gunvor" not in volumes.index
+
+
+def test_shipped_aliases_roll_up_report_names():
+    index = CounterpartyIndex.load()
+    trades = [Trade(date="06-10-2025", product="EBOB", price=1.0, volume_kt=5.0, buyer="Vitol S.A.",
+                    seller="Shell International Trading", window="FE", raw_text="", type="trade"),
+              Trade(date="06-10-2025", product="EBOB", price=1.0, volume_kt=2.0, buyer="SHELL",
+                    seller="Totsa", window="FE", raw_text="", type="trade")]
+    volumes = counterparty_volumes(trades, index).set_index("counterparty")
+    assert volumes["total_kt"].to_dict() == {"shell": 7.0, "vitol": 5.0, "totalenergies": 2.0}
@@ -0,0 +1,42 @@
+import dataclasses
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.Export import table_types, write_parquet
+from src.models import Trade
+
+
+def make_trade(price) -> Trade:
+    return Trade(date="06-10-2025", product="Naphtha", price=price, volume_kt=2, buyer="Shell",
+                 seller="BP", window="10-14", raw_text="Shell buys from BP", type="trade")
+
+
+def read_back(buffer: io.BytesIO) -> pa.Table:
+    buffer.seek(0)
+    return pq.read_table(buffer)
+
+
+def test_declared_float_columns_accept_ints_in_the_first_chunk():
+    trades = [make_trade(5)] * 3 + [make_trade(-1.38)]
+    as_dicts = [dataclasses.asdict(trade) for trade in trades]
+
+    for records, types in ((trades, None), (as_dicts, table_types("trades"))):
+        buffer = io.BytesIO()
+        write_parquet(records, buffer, chunk_size=3, types=types)
+        table = read_back(buffer)
+        assert table.schema.field("price").type == pa.float64()
+        assert table.schema.field("volume_kt").type == pa.float64()
+        assert table.column("price").to_pylist() == [5.0, 5.0, 5.0, -1.38]
+
+
+def test_undeclared_columns_are_widened_and_not_locked_to_string():
+    records = [{"id": i, "premium": None} for i in range(3)] + [{"id": 3.5, "premium": 1.5}]
+    buffer = io.BytesIO()
+    write_parquet(records, buffer, chunk_size=3)
+
+    table = read_back(buffer)
+    assert table.schema.field("id").type == pa.float64()
+    assert table.schema.field("premium").type == pa.float64()
+    assert table.column("premium").to_pylist() == [None, None, None, 1.5]
@@ -0,0 +1,84 @@
+import json
+import threading
+import time
+
+import pytest
+
+import src.InboxDaemon as InboxDaemon
+
+
+def wait_for(condition, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return
+        time.sleep(0.05)
+    raise AssertionError("condition not met in time")
+
+
+@pytest.fixture
+def run_daemon(tmp_path):
+    daemons = []
+
+    def run(**kwargs):
+        daemon = InboxDaemon.InboxDaemon(str(tmp_path / "inbox"), str(tmp_path / "results"), polling=True,
+                                         settle_seconds=0.1, **kwargs)
+        daemon.watcher.interval = 0.05
+        thread = threading.Thread(target=daemon.run, daemon=True)
+        thread.start()
+        daemons.append((daemon, thread))
+        return daemon
+
+    (tmp_path / "inbox").mkdir()
+    yield run
+    for daemon, thread in daemons:
+        daemon.stop()
+        thread.join(timeout=5)
+
+
+def ledger_entries(tmp_path):
+    path = tmp_path / "results" / "processed.json"
+    return list(json.loads(path.read_text()).values()) if path.exists() else []
+
+
+def test_failed_file_is_retried(tmp_path, run_daemon, monkeypatch):
+    calls = []
+
+    def handler(path):
+        calls.append(path)
+        if len(calls) == 1:
+            raise ConnectionError("OpenAI unavailable")
+        return {"date": "06-10-2025", "trades": []}
+
+    monkeypatch.setitem(InboxDaemon.HANDLERS, ".txt", handler)
+    (tmp_path / "inbox" / "moc.txt").write_text("report")
+    run_daemon(retry_delay=0.2)
+
+    wait_for(lambda: [e.get("status") for e in ledger_entries(tmp_path)] == ["done"])
+    assert len(calls) == 2
+
+
+def test_failed_file_is_retried_after_restart_until_max_attempts(tmp_path, run_daemon, monkeypatch):
+    calls = []
+
+    def handler(path):
+        calls.append(path)
+        raise ConnectionError("OpenAI unavailable")
+
+    monkeypatch.setitem(InboxDaemon.HANDLERS, ".txt", handler)
+    (tmp_path / "inbox" / "moc.txt").write_text("report")
+    daemon = run_daemon(retry_delay=60, max_attempts=2)
+    wait_for(lambda: len(ledger_entries(tmp_path)) == 1)
+    daemon.stop()
+
+    # the retry is due by the next start
+    ledger_path = tmp_path / "results" / "processed.json"
+    ledger = json.loads(ledger_path.read_text())
+    for entry in ledger.values():
+        entry["retry_at"] = 0
+    ledger_path.write_text(json.dumps(ledger))
+
+    run_daemon(retry_delay=0, max_attempts=2)
+    wait_for(lambda: [e.get("attempts") for e in ledger_entries(tmp_path)] == [2])
+    time.sleep(0.5)
+    assert len(calls) == 2
@@ -0,0 +1,31 @@
+import pdfplumber
+
+from src.PdfCreation import create_trade_report_pdf, offer_bid_row, trade_row, window_row
+from src.models import Offers_Bids, Trade, Windows
+
+
+def test_missing_trade_fields_are_dashes():
+    trade = Trade(date=None, product=None, price=2, volume_kt=None, buyer="BP", seller=None,
+                  window=None, raw_text="BP bid 2", type=None)
+    assert trade_row(trade) == ("-", "-", "-", "-", "BP", "-", "2.00", "-")
+
+
+def test_offer_bid_and_window_rows():
+    offer = Offers_Bids(date=None, product="EBOB", type="offer", participant=None, price=0.0, window="N/A")
+    assert offer_bid_row(offer) == ("-", "EBOB", "offer", "-")
+    assert window_row(Windows(type="FE", Dates=None)) == ("FE", "-")
+
+
+def test_trade_table_header_repeats_on_every_page(tmp_path):
+    trades = (Trade(date="06-10-2025", product="EBOB", price=-1.38, volume_kt=2, buyer=f"Buyer {i}",
+                    seller="Shell", window="FE", raw_text="", type="trade") for i in range(150))
+    path = tmp_path / "moc.pdf"
+    counts = create_trade_report_pdf(path, trades, [], [Windows(type="FE", Dates="1-5 Oct")], [], "06-10-2025")
+
+    assert counts == {"windows": 1, "overviews": 0, "trades": 150, "offers_bids": 0}
+    with pdfplumber.open(path) as pdf:
+        trade_pages = [page.extract_text() for page in pdf.pages if "Buyer " in page.extract_text()]
+    assert len(trade_pages) >= 3
+    for text in trade_pages:
+        assert "Date Product Type Seller Buyer kt Price Window" in text
+    assert "Buyer 149" in trade_pages[-1]
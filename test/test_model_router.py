@@ -0,0 +1,55 @@
+import httpx
+import openai
+import pytest
+
+from src.OpenAi import ModelRoute, ModelRouter, score_trade_text, trade_router
+from src.models import RawTradeText
+
+
+REQUEST = httpx.Request("POST", "http://localhost/v1/chat/completions")
+
+
+def make_router():
+    return ModelRouter([ModelRoute("small", "small-model", 3), ModelRoute("large", "large-model", float("inf"))])
+
+
+def test_invalid_answer_escalates():
+    router = make_router()
+    assert router.run(1, lambda model: model, lambda result: result == "large-model") == "large-model"
+    assert router.stats()["small"]["escalations"] == 1
+
+
+def test_api_error_escalates():
+    router = make_router()
+
+    def call(model):
+        if model == "small-model":
+            raise openai.RateLimitError("rate limited", response=httpx.Response(429, request=REQUEST), body=None)
+        return "answer"
+
+    assert router.run(1, call, bool) == "answer"
+    assert router.stats()["small"]["failures"] == 1
+    assert router.stats()["small"]["escalations"] == 1
+
+
+def test_api_error_on_last_route_is_raised():
+    router = make_router()
+
+    def call(model):
+        raise openai.APIConnectionError(request=REQUEST)
+
+    with pytest.raises(openai.APIConnectionError):
+        router.run(1, call, bool)
+    assert router.stats()["large"]["failures"] == 1
+
+
+@pytest.mark.parametrize("text, trade_type, route", [
+    ("Vitol 2kt $-1.38 MW", "last bid", "small"),
+    ("Vitol", "last offer", "small"),
+    ("Shell / BP 2kt $-1.38 FE", "trade", "small"),
+    ("Shell / BP 2kt $-1.38 FE\nVitol sells 3kt to Total, price to be confirmed\n"
+     "BP / Glencore 1.5kt $-1.2 MW, Shell / Vitol 2kt\nrest of the day quiet", "trade", "large"),
+])
+def test_trade_routing(text, trade_type, route):
+    raw_trade = RawTradeText(product="EBOB", text=text, type=trade_type)
+    assert trade_router.routes[trade_router.route_for(score_trade_text(raw_trade))].name == route
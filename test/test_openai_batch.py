@@ -0,0 +1,115 @@
+import json
+import os
+from unittest import mock
+
+import pytest
+from openai import OpenAI
+
+from src.OpenAiBatch import TradeBatchJob
+from src.OpenAiStandIn import LocalOpenAIServer, default_responder
+from src.models import RawTradeText
+
+
+ITEMS = [
+    (RawTradeText(product="EBOB", text="Shell / BP 5kt $12.5 FE", type="trade"), "06-10-2025"),
+    (RawTradeText(product="Naphtha", text="Vitol 2kt $-1.38 MW", type="last bid"), "06-10-2025"),
+]
+
+
+@pytest.fixture
+def openai_server():
+    with LocalOpenAIServer(batch_delay=0.2) as server:
+        yield server
+
+
+def make_job(server, state_path):
+    client = OpenAI(api_key="test", base_url=server.base_url)
+    return TradeBatchJob(str(state_path), client=client, model="batch-model", poll_interval=0.05)
+
+
+def test_resume_after_crash(openai_server, tmp_path):
+    state_path = tmp_path / "batch_state.json"
+    batch_id = make_job(openai_server, state_path).submit(ITEMS)
+    # the process dies here, a new job picks up the same batch from the state file
+
+    job = make_job(openai_server, state_path)
+    trades, errors = job.run(ITEMS, timeout=10)
+
+    assert list(openai_server.batches) == [batch_id]
+    assert errors == {}
+    by_text = {item["text"]: custom_id for custom_id, item in job.state["items"].items()}
+    trade = trades[by_text["Shell / BP 5kt $12.5 FE"]][0]
+    assert (trade.seller, trade.buyer, trade.price, trade.volume_kt) == ("Shell", "BP", 12.5, 5.0)
+    bid = trades[by_text["Vitol 2kt $-1.38 MW"]][0]
+    assert (bid.buyer, bid.price, bid.window, bid.type) == ("Vitol", -1.38, "MW", "last bid")
+
+
+def test_state_of_other_items_is_rejected(openai_server, tmp_path):
+    state_path = tmp_path / "batch_state.json"
+    make_job(openai_server, state_path).submit(ITEMS)
+
+    with pytest.raises(ValueError, match="other trade blocks"):
+        make_job(openai_server, state_path).submit(ITEMS[:1])
+    assert len(openai_server.batches) == 1
+
+
+def test_failed_requests_come_from_the_error_file(tmp_path):
+    def responder(body):
+        if "Vitol" in body["messages"][-1]["content"]:
+            raise RuntimeError("model overloaded")
+        return default_responder(body)
+
+    with LocalOpenAIServer(responder=responder) as server:
+        job = make_job(server, tmp_path / "batch_state.json")
+        trades, errors = job.run(ITEMS, timeout=10)
+
+    by_text = {item["text"]: custom_id for custom_id, item in job.state["items"].items()}
+    assert list(trades) == [by_text["Shell / BP 5kt $12.5 FE"]]
+    assert "model overloaded" in errors[by_text["Vitol 2kt $-1.38 MW"]]
+
+
+def test_batch_where_every_request_failed(tmp_path):
+    def responder(body):
+        raise RuntimeError("model overloaded")
+
+    with LocalOpenAIServer(responder=responder) as server:
+        trades, errors = make_job(server, tmp_path / "batch_state.json").run(ITEMS, timeout=10)
+
+    assert trades == {}
+    assert len(errors) == 2 and all("model overloaded" in error for error in errors.values())
+
+
+def test_block_failing_validation_is_only_an_error(tmp_path):
+    # a trade without a seller breaks the rules of the prompt
+    with LocalOpenAIServer(responder=lambda body: json.dumps([{"buyer": "BP", "price": 12.5}])) as server:
+        trades, errors = make_job(server, tmp_path / "batch_state.json").run(ITEMS[:1], timeout=10)
+
+    assert trades == {}
+    assert list(errors.values()) == ["Answer failed validation"]
+
+
+def test_interrupted_download_is_not_trusted(openai_server, tmp_path):
+    state_path = tmp_path / "batch_state.json"
+    job = make_job(openai_server, state_path)
+    job.submit(ITEMS)
+    job.poll(timeout=10)
+
+    class BrokenDownload:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def iter_bytes(self):
+            yield b'{"custom_id": "trade-0'
+            raise ConnectionError("connection reset")
+
+    with mock.patch.object(job.client.files.with_streaming_response, "content",
+                           lambda file_id: BrokenDownload()):
+        with pytest.raises(ConnectionError):
+            job.results()
+    assert not os.path.exists(f"{state_path}.output.jsonl")
+
+    trades, errors = make_job(openai_server, state_path).results()
+    assert errors == {} and len(trades) == 2
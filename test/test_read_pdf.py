@@ -0,0 +1,39 @@
+import io
+
+from fpdf import FPDF
+
+from src.MorningUpdate.ReadPdf import GasOilExtractor
+
+
+def make_pdf(pages):
+    pdf = FPDF()
+    pdf.set_font("Helvetica", size=11)
+    for lines in pages:
+        pdf.add_page()
+        for line in lines:
+            pdf.cell(0, 8, line, new_x="LMARGIN", new_y="NEXT")
+    return io.BytesIO(bytes(pdf.output()))
+
+
+ARA_TABLE = ["ARA CROSS HARBOR 12.50", "ROTTERDAM ANTWERP 13.25", "GHENT AMSTERDAM 14.00"]
+
+
+def test_only_pages_with_a_layout_are_extracted():
+    pages = [["Barge freight report"]] + [[f"Market comment page {i}"] for i in range(1, 9)]
+    pages[4] = ARA_TABLE
+    extractor = GasOilExtractor(make_pdf(pages))
+
+    # the first page and the page with the ARA table, the missing Rhine layout adds nothing
+    assert sorted(extractor.page_texts) == [0, 4]
+
+    extractor.set_data_text()
+    extractor.set_df()
+    assert extractor.type_report == "ARA"
+    assert extractor.df["avg price"].tolist() == [12.5, 13.25, 14.0]
+
+
+def test_without_index_every_page_is_a_candidate():
+    extractor = GasOilExtractor(make_pdf([["Barge freight report"], ARA_TABLE, ["Comment"]]))
+    assert extractor._candidate_pages(3, None) == [0, 1, 2]
+    # a page PyPDF2 couldn't read stays a candidate
+    assert extractor._candidate_pages(3, ["report", None, "comment"]) == [0, 1]
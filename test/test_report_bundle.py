@@ -0,0 +1,46 @@
+import io
+from types import SimpleNamespace
+
+import pandas as pd
+import pdfplumber
+
+from src.PdfCreation import build_barging_report
+from src.ReportBundle import DEFAULT_PROFILES, RecipientProfile, render_report_bundle
+
+
+def make_extractor(rows: int):
+    df = pd.DataFrame({"location": [f"Location {i}" for i in range(rows)], "price range": ["EUR 10 - 12"] * rows})
+    return SimpleNamespace(df=df, summary_text="Rates were stable. " * 20)
+
+
+def page_texts(pdf_bytes: bytes):
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        return [page.extract_text() for page in pdf.pages]
+
+
+def test_profiles_are_assembled_from_one_render():
+    water_levels = pd.DataFrame({"Station": ["Kaub"], "Current (cm)": [120], "4 day - Forecast (cm)": [110]})
+    # the Rhine table runs onto a second page
+    pdfs = render_report_bundle(DEFAULT_PROFILES, make_extractor(5), make_extractor(45), water_levels, "06-10-2025")
+
+    ara, rhine, full = (page_texts(pdfs[name]) for name in ("ARA", "Rhine", "Full"))
+    assert len(ara) == 1 and "ARA Barge Freight Market" in ara[0]
+    assert len(rhine) == 2 and "Rhine Barge Freight Market" in rhine[0]
+    assert len(full) == 4 and "Rhine Water Levels" in full[3]
+    # page numbers count within every variant
+    assert [text.splitlines()[-1] for text in rhine] == ["Page 1", "Page 2"]
+    assert full[3].splitlines()[-1] == "Page 4"
+
+
+def footer_fonts(pdf_bytes: bytes):
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        return [{c["fontname"].split("+")[-1] for c in page.chars if c["top"] > page.height - 40}
+                for page in pdf.pages]
+
+
+def test_page_numbers_use_the_report_font():
+    extractor = make_extractor(5)
+    single = bytes(build_barging_report(extractor, None, None, "06-10-2025", sections=("ara",)).output())
+    bundle = render_report_bundle([RecipientProfile("ARA", ("ara",))], extractor, None, None, "06-10-2025")
+
+    assert footer_fonts(bundle["ARA"]) == footer_fonts(single)
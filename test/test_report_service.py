@@ -0,0 +1,122 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+import src.ReportService as ReportService
+from src.ReportService import JobManager, make_server
+from src.models import Trade
+
+
+MOC_REPORT = """Date: 06-10-2025
+Window dates:
+FE 1-5 Oct
+MW 10-14 Oct
+==========
+EBOB:
+Offers: Shell/BP
+Bids: Vitol
+Trades:
+Shell / BP 2kt $-1.38 FE
+Average Price: $-1.38
+Total Volume: 2
+"""
+
+
+@pytest.fixture
+def service(tmp_path):
+    server = make_server(port=0, workers=2, results_dir=str(tmp_path))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def request(url: str, body: bytes = None):
+    """(status, parsed JSON body) of a GET, or a POST when there is a body."""
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=body), timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_job_manager_reports_failed_jobs():
+    jobs = JobManager(max_workers=1)
+
+    def fail():
+        raise RuntimeError("boom")
+
+    job_id = jobs.submit(fail)
+    with pytest.raises(RuntimeError):
+        jobs.get(job_id).result(timeout=5)
+    assert jobs.status(job_id) == {"id": job_id, "status": "failed", "error": "boom"}
+    assert jobs.status("unknown") is None
+
+
+def test_async_moc_job(service):
+    status, job = request(f"{service}/moc?async=1&trades=0", MOC_REPORT.encode())
+    assert status == 202
+
+    deadline = time.monotonic() + 10
+    while request(f"{service}{job['status_url']}")[1]["status"] != "done":
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+    status, result = request(f"{service}/jobs/{job['id']}/result")
+    assert status == 200
+    assert result["date"] == "06-10-2025"
+    assert [w["type"] for w in result["windows"]] == ["FE", "MW"]
+    assert result["raw_trades"][0]["text"] == "Shell / BP 2kt $-1.38 FE"
+    assert result["trades"] == []
+
+
+def test_export_counterparty_rollup(service, monkeypatch):
+    def extract_trades(raw_trade, date):
+        return [Trade(date=date, product=raw_trade.product, price=-1.38, volume_kt=2.0, buyer="BP Oil",
+                      seller="Shell International Trading", window="FE", raw_text=raw_trade.text, type="trade")]
+
+    monkeypatch.setattr(ReportService, "extract_trades_from_rawtext", extract_trades)
+    with urllib.request.urlopen(urllib.request.Request(
+            f"{service}/export/moc?table=counterparties&format=csv", data=MOC_REPORT.encode()), timeout=10) as r:
+        rows = r.read().decode().splitlines()
+    assert rows == ["counterparty,name,bought_kt,sold_kt,total_kt", "bp,BP,2.0,0.0,2.0", "shell,Shell,0.0,2.0,2.0"]
+
+    status, result = request(f"{service}/moc?trades=0", MOC_REPORT.encode())
+    assert [(a["counterparty"], a["offer"], a["bid"]) for a in result["counterparty_activity"]] == [
+        ("bp", 1, 0), ("shell", 1, 0), ("vitol", 0, 1)]
+
+
+@pytest.mark.parametrize("path, body", [
+    ("/moc", b"not a report"),
+    ("/export/moc?table=trades", b""),
+    ("/analyse", b"not a pdf"),
+    ("/export/analyse", b"not a pdf"),
+    ("/barging-report", json.dumps({"pdfs": ["bm90IGEgcGRm"]}).encode()),
+    ("/export/moc?format=doc", MOC_REPORT.encode()),
+])
+def test_invalid_requests_are_rejected(service, path, body):
+    status, response = request(f"{service}{path}", body)
+    assert status == 400
+    assert "error" in response
+
+
+def test_unknown_job(service):
+    assert request(f"{service}/jobs/missing")[0] == 404
+
+
+def test_moc_cli_prints_only_json(tmp_path):
+    report = tmp_path / "report.txt"
+    report.write_text(MOC_REPORT)
+    output = subprocess.run([sys.executable, "-m", "src.ReportService", "moc", str(report), "--no-trades"],
+                            capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert json.loads(output.stdout)["date"] == "06-10-2025"
+    assert "Processing product: EBOB" in output.stderr
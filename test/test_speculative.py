@@ -0,0 +1,45 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.MorningUpdate.Speculative import SpeculativeAnalyser, file_hash
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        yield executor
+
+
+def test_failed_analysis_is_retried_on_next_sync(executor, monkeypatch):
+    calls = []
+
+    def analyse(data, cancel):
+        calls.append(data)
+        if len(calls) == 1:
+            raise ConnectionError("OpenAI unavailable")
+        return f"extractor {len(calls)}"
+
+    monkeypatch.setattr(SpeculativeAnalyser, "_analyse", staticmethod(analyse))
+    analyser = SpeculativeAnalyser(executor)
+
+    [key] = analyser.sync([b"report"])
+    with pytest.raises(ConnectionError):
+        analyser.result(key)
+
+    assert analyser.sync([b"report"]) == [key]
+    assert analyser.result(key) == "extractor 2"
+    # a successful analysis is reused
+    analyser.sync([b"report"])
+    assert analyser.result(key) == "extractor 2"
+    assert len(calls) == 2
+
+
+def test_removed_upload_is_forgotten(executor, monkeypatch):
+    monkeypatch.setattr(SpeculativeAnalyser, "_analyse", staticmethod(lambda data, cancel: data))
+    analyser = SpeculativeAnalyser(executor)
+    analyser.sync([b"a", b"b"])
+    analyser.sync([b"b"])
+    with pytest.raises(KeyError):
+        analyser.result(file_hash(b"a"))
+    assert analyser.result(file_hash(b"b")) == b"b"
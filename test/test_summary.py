@@ -0,0 +1,86 @@
+import io
+import time
+
+import pytest
+from fpdf import FPDF
+from openai import OpenAI
+
+import src.MorningUpdate.ReadPdf as ReadPdf
+import src.OpenAi as OpenAi
+from src.MorningUpdate.Summarizer import split_sentences, summarize_text_local
+from src.OpenAiStandIn import LocalOpenAIServer
+
+
+FIRST_PAGE = [
+    "Barge Freight Report",
+    "Rates in the ARA region were stable this week as demand stayed moderate.",
+    "Low water on the Rhine pushed freight rates higher for the larger barges.",
+    "ARA CROSS HARBOR 12.50 13.00",
+    "ROTTERDAM ANTWERP 13.25 14.00",
+    "Tonnage supply remains tight and owners are asking for firmer rates.",
+    "Gasoil demand from inland depots is expected to pick up next week.",
+]
+
+
+def make_extractor():
+    pdf = FPDF()
+    pdf.set_font("Helvetica", size=11)
+    pdf.add_page()
+    for line in FIRST_PAGE:
+        pdf.cell(0, 8, line, new_x="LMARGIN", new_y="NEXT")
+    return ReadPdf.GasOilExtractor(io.BytesIO(bytes(pdf.output())))
+
+
+def test_split_sentences_drops_table_rows():
+    sentences = split_sentences("\n".join(FIRST_PAGE))
+    assert sentences == [FIRST_PAGE[1], FIRST_PAGE[2], FIRST_PAGE[5], FIRST_PAGE[6]]
+
+
+def test_local_summary_keeps_report_order():
+    summary = summarize_text_local("\n".join(FIRST_PAGE), num_sentences=2)
+    picked = [line for line in FIRST_PAGE if line in summary]
+    assert len(picked) == 2 and summary == " ".join(picked)
+
+
+def failing_summary(pdf_text, timeout=None):
+    raise ConnectionError("OpenAI unavailable")
+
+
+def test_local_mode_makes_no_call(monkeypatch):
+    monkeypatch.setattr(ReadPdf, "summarize_pdf_text", failing_summary)
+    extractor = make_extractor()
+    extractor.set_summary_text("local")
+    assert extractor.summary_text == extractor.draft_summary != ""
+
+
+def test_fallback_mode_uses_the_local_summary(monkeypatch):
+    monkeypatch.setattr(ReadPdf, "summarize_pdf_text", failing_summary)
+    extractor = make_extractor()
+    extractor.set_summary_text("fallback")
+    assert extractor.summary_text == extractor.draft_summary != ""
+
+
+def test_openai_mode_raises(monkeypatch):
+    monkeypatch.setattr(ReadPdf, "summarize_pdf_text", failing_summary)
+    with pytest.raises(ConnectionError):
+        make_extractor().set_summary_text("openai")
+
+
+def test_openai_summary_is_used(monkeypatch):
+    monkeypatch.setattr(ReadPdf, "summarize_pdf_text", lambda pdf_text, timeout=None: "OpenAI summary.")
+    extractor = make_extractor()
+    extractor.set_summary_text("fallback")
+    assert extractor.summary_text == "OpenAI summary."
+
+
+def test_fallback_after_summary_timeout(monkeypatch):
+    monkeypatch.setenv("SUMMARY_TIMEOUT", "0.3")
+    with LocalOpenAIServer(latency=3) as server:
+        monkeypatch.setattr(OpenAi, "_client", OpenAI(api_key="test", base_url=server.base_url))
+        extractor = make_extractor()
+        started = time.perf_counter()
+        extractor.set_summary_text("fallback")
+        elapsed = time.perf_counter() - started
+
+    assert extractor.summary_text == extractor.draft_summary != ""
+    assert elapsed < 1.5
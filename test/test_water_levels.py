@@ -0,0 +1,90 @@
+import time
+
+import pytest
+
+from src.MorningUpdate.GaugeStandIn import LocalGaugeServer
+from src.MorningUpdate.WaterLevels import (
+    COLUMN_CURRENT, COLUMN_FORECAST, COLUMN_STATION, RHINE_STATIONS, GaugeProvider, PegelOnlineProvider,
+    WaterLevelStore, fetch_readings, get_water_levels,
+)
+
+
+LEVELS = {
+    "KAUB": (120.0, [118.0, 115.0, 112.0, 110.0]),
+    "MAXAU": (450.0, [440.0, 430.0, 420.0, 410.0]),
+}
+STATIONS = {"Kaub": "KAUB", "Maxau": "MAXAU"}
+
+
+@pytest.fixture
+def gauge_server():
+    with LocalGaugeServer(dict(LEVELS)) as server:
+        yield server
+
+
+def test_gauge_provider_is_abstract():
+    with pytest.raises(TypeError):
+        GaugeProvider()
+
+
+def test_cached_response_within_ttl(gauge_server):
+    provider = PegelOnlineProvider(base_url=gauge_server.base_url, ttl_seconds=60)
+    assert provider.fetch_current("KAUB")[0] == 120.0
+    assert provider.fetch_current("KAUB")[0] == 120.0
+    assert gauge_server.request_count == 1
+
+
+def test_expired_response_is_revalidated(gauge_server):
+    provider = PegelOnlineProvider(base_url=gauge_server.base_url, ttl_seconds=0)
+    assert provider.fetch_current("KAUB")[0] == 120.0
+    assert provider.fetch_current("KAUB")[0] == 120.0
+    assert gauge_server.request_count == 2
+    assert gauge_server.not_modified_count == 1
+
+    # a changed level gets a new etag and a full response
+    gauge_server.levels["KAUB"] = (125.0, LEVELS["KAUB"][1])
+    assert provider.fetch_current("KAUB")[0] == 125.0
+    assert gauge_server.not_modified_count == 1
+
+
+def test_forecast_picks_level_days_ahead(gauge_server):
+    provider = PegelOnlineProvider(base_url=gauge_server.base_url)
+    assert provider.fetch_forecast("KAUB", days=2) == 115.0
+    # the forecast ends before the target, the last point is used
+    assert provider.fetch_forecast("KAUB", days=10) == 110.0
+
+
+def test_fetch_readings_is_concurrent():
+    with LocalGaugeServer(dict(LEVELS), latency=0.3) as server:
+        provider = PegelOnlineProvider(base_url=server.base_url)
+        started = time.perf_counter()
+        readings = fetch_readings(provider, STATIONS)
+        elapsed = time.perf_counter() - started
+    # 4 requests of 0.3s each, sequential would take 1.2s
+    assert elapsed < 0.9
+    assert [(r.station, r.current_cm, r.forecast_cm) for r in readings] == [
+        ("Kaub", 120.0, 110.0), ("Maxau", 450.0, 410.0)]
+
+
+def test_failing_station_does_not_fail_the_table(gauge_server):
+    provider = PegelOnlineProvider(base_url=gauge_server.base_url)
+    readings = fetch_readings(provider, {**STATIONS, "Unknown": "NOT-A-GAUGE"})
+    by_station = {r.station: r for r in readings}
+    assert by_station["Kaub"].current_cm == 120.0
+    assert by_station["Unknown"].current_cm is None
+    assert by_station["Unknown"].forecast_cm is None
+
+
+def test_get_water_levels_stores_and_falls_back(tmp_path):
+    levels = {gauge_id: (100.0 + i, [90.0 + i]) for i, gauge_id in enumerate(RHINE_STATIONS.values())}
+    store = WaterLevelStore(str(tmp_path))
+    with LocalGaugeServer(levels) as server:
+        df = get_water_levels(PegelOnlineProvider(base_url=server.base_url), store)
+        assert list(df.columns) == [COLUMN_STATION, COLUMN_CURRENT, COLUMN_FORECAST]
+        assert df[COLUMN_CURRENT].tolist() == [100.0, 101.0, 102.0, 103.0]
+        assert len(store.load_history()) == len(RHINE_STATIONS)
+
+        # nothing can be fetched, the stored table is used
+        server.levels.clear()
+        df = get_water_levels(PegelOnlineProvider(base_url=server.base_url), store)
+    assert df[COLUMN_CURRENT].tolist() == [100.0, 101.0, 102.0, 103.0]